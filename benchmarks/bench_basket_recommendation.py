@@ -0,0 +1,59 @@
+"""History-based recommendations: scanning every pattern per customer versus PatternTrie"""
+import sys
+import time
+
+from synthetic import make_transactions
+
+from recommendation import PatternTrie, customer_histories
+from spade_algorithm import SPADEAlgorithm, is_subsequence
+
+
+def scan(rules, history, k=20):
+    """Test every rule prefix against the history"""
+    itemsets = [frozenset(itemset) for itemset in history]
+    best = {}
+    for prefix, items, confidence in rules:
+        if is_subsequence(prefix, itemsets):
+            for item in items:
+                best[item] = max(best.get(item, 0.0), confidence)
+    return sorted(best.items(), key=lambda entry: -entry[1])[:k]
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 6_000
+    min_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+    recent = 4
+    df = make_transactions(n_rows, seed=4)
+    
+    spade = SPADEAlgorithm(min_support=min_support, search='dfs')
+    spade.preprocess_data(df)
+    sequences = spade.find_frequent_sequences()
+    histories = customer_histories(df, recent=recent)
+    
+    # The scan gets its rules precomputed too, so only the matching is compared
+    supports = {tuple(map(tuple, seq)): support for seq, support in sequences}
+    rules = [([frozenset(itemset) for itemset in seq[:-1]], seq[-1],
+              support / supports[tuple(map(tuple, seq[:-1]))])
+             for seq, support in sequences if len(seq) > 1]
+    start = time.perf_counter()
+    for history in histories.values():
+        scan(rules, history)
+    scan_time = (time.perf_counter() - start) / len(histories)
+    
+    start = time.perf_counter()
+    trie = PatternTrie(sequences)
+    build_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    trie.recommend_batch(histories)
+    trie_time = (time.perf_counter() - start) / len(histories)
+    
+    print(f"{n_rows:,} rows, min_support={min_support}: {len(sequences):,} patterns, "
+          f"{len(histories):,} customers (last {recent} invoices)")
+    print(f"scan per customer:     {scan_time * 1000:10.3f} ms")
+    print(f"trie build (once):     {build_time * 1000:10.3f} ms")
+    print(f"trie per customer:     {trie_time * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
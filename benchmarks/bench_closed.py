@@ -0,0 +1,46 @@
+"""Closed and maximal output versus all frequent sequences on dense data"""
+import sys
+import time
+
+import pandas as pd
+
+from synthetic import make_transactions
+
+from recommendation import generate_recommendations_from_sequences
+from spade_algorithm import SPADEAlgorithm
+
+
+def dense_transactions(n_rows, seed=4):
+    """Few items, and accessories always bought with their product (dense, many equal supports)"""
+    df = make_transactions(n_rows, n_items=30, items_per_invoice=5, seed=seed)
+    accessories = []
+    for product in ("P0", "P1", "P2"):
+        rows = df[df["StockCode"] == product].copy()
+        rows["StockCode"] = product + "-CASE"
+        accessories.append(rows)
+    return pd.concat([df] + accessories, ignore_index=True)
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    min_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.6
+    df = dense_transactions(n_rows)
+    targets = df["StockCode"].value_counts().index[:20].tolist()
+    print(f"{len(df):,} rows, min_support={min_support}")
+    print(f"{'output':>8}  {'patterns':>9}  {'candidates':>10}  {'mine (s)':>8}  {'20 queries (s)':>14}")
+    for output in ("all", "closed", "maximal"):
+        spade = SPADEAlgorithm(min_support=min_support, search="dfs", output=output)
+        spade.preprocess_data(df)
+        start = time.perf_counter()
+        result = spade.find_frequent_sequences()
+        mine_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for target in targets:
+            generate_recommendations_from_sequences(result, target)
+        query_time = time.perf_counter() - start
+        print(f"{output:>8}  {len(result):>9,}  {spade.stats['candidates']:>10,}  {mine_time:>8.2f}  {query_time:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Gap, window and max-length constraints versus unconstrained mining"""
+import sys
+import time
+
+from synthetic import make_transactions
+
+from spade_algorithm import SPADEAlgorithm
+
+
+def run(df, min_support, **constraints):
+    spade = SPADEAlgorithm(min_support=min_support, search='dfs', engine='idlist', **constraints)
+    spade.preprocess_data(df)
+    start = time.perf_counter()
+    result = spade.find_frequent_sequences()
+    return time.perf_counter() - start, result, spade.stats['candidates']
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    min_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+    df = make_transactions(n_rows, seed=5)
+
+    cases = [
+        ('none', {}),
+        ('max_length=3', {'max_length': 3}),
+        ('max_gap=60', {'max_gap': 60}),
+        ('max_gap=30', {'max_gap': 30}),
+        ('max_gap=14, max_window=30', {'max_gap': 14, 'max_window': 30}),
+        ('min_gap=1, max_gap=7, max_length=3', {'min_gap': 1, 'max_gap': 7, 'max_length': 3}),
+    ]
+    print(f"{n_rows:,} rows, min_support={min_support} (gaps in days)")
+    print(f"{'constraints':<36}  {'patterns':>8}  {'candidates':>10}  {'time (s)':>8}")
+    for name, constraints in cases:
+        elapsed, result, candidates = run(df, min_support, **constraints)
+        print(f"{name:<36}  {len(result):>8,}  {candidates:>10,}  {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Id-list vs bitmap engine on datasets of increasing density.
+
+    python benchmarks/bench_engines.py
+"""
+import time
+
+from synthetic import make_transactions
+from spade_algorithm import SPADEAlgorithm
+from bitmap_engine import bitmap_density
+
+
+def run(df, min_support, engine):
+    spade = SPADEAlgorithm(min_support, search='dfs', engine=engine)
+    spade.preprocess_data(df)
+    start = time.perf_counter()
+    patterns = spade.find_frequent_sequences()
+    return time.perf_counter() - start, len(patterns), spade
+
+
+def main():
+    datasets = [
+        # name, frame, min_support
+        ("sparse: 50k customers, ~4 invoices", make_transactions(200_000, n_customers=50_000, n_items=2000), 0.01),
+        ("medium: 10k customers, ~20 invoices", make_transactions(200_000, n_customers=10_000, n_items=500), 0.05),
+        ("dense: 2k customers, ~25 invoices", make_transactions(200_000, n_customers=2_000, n_items=100, items_per_invoice=25), 0.4),
+    ]
+    print(f"{'dataset':<38}{'density':>9}{'patterns':>10}{'idlist s':>10}{'bitmap s':>10}{'auto':>8}")
+    for name, df, min_support in datasets:
+        idlist_time, count, spade = run(df, min_support, 'idlist')
+        bitmap_time, bitmap_count, _ = run(df, min_support, 'bitmap')
+        assert count == bitmap_count
+        density = bitmap_density(spade.vertical_db.values(), spade.words_per_sequence())
+        auto = SPADEAlgorithm(min_support)
+        auto.preprocess_data(df)
+        auto.find_frequent_items()
+        print(f"{name:<38}{density:>9.3f}{count:>10,}{idlist_time:>10.2f}{bitmap_time:>10.2f}"
+              f"{auto.selected_engine:>8}")
+
+
+if __name__ == "__main__":
+    main()
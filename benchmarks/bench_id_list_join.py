@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of the temporal id-list join.
+
+Compares the original dict-based join over (sid, pos) tuples with
+SPADEAlgorithm.id_list_join (sorted merge on IdList arrays).
+
+    python benchmarks/bench_id_list_join.py
+"""
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import synthetic  # noqa: F401  (puts src/ on sys.path)
+from spade_algorithm import IdList, SPADEAlgorithm
+
+
+def dict_join(id_list1, id_list2):
+    """The original id_list_join"""
+    result = []
+    seq_pos_dict = defaultdict(list)
+    for seq_id, pos in id_list1:
+        seq_pos_dict[seq_id].append(pos)
+    for seq_id, pos2 in id_list2:
+        if seq_id in seq_pos_dict:
+            for pos1 in seq_pos_dict[seq_id]:
+                if pos1 < pos2:
+                    result.append((seq_id, pos2))
+                    break
+    return result
+
+
+def random_id_list(rng, n_entries, n_sequences, max_pos):
+    sids = rng.integers(0, n_sequences, n_entries)
+    eids = rng.integers(0, max_pos, n_entries)
+    pairs = np.unique(sids.astype(np.int64) * max_pos + eids)
+    return IdList((pairs // max_pos).astype(np.int32), (pairs % max_pos).astype(np.int32))
+
+
+def best_of(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    spade = SPADEAlgorithm()
+    print(f"{'entries':>10}{'dict join (ms)':>16}{'merge join (ms)':>17}{'speed-up':>10}")
+    for n_entries in (10_000, 100_000, 1_000_000):
+        n_sequences = max(n_entries // 20, 1)
+        spade.sequence_count = n_sequences
+        list1 = random_id_list(rng, n_entries, n_sequences, 40)
+        list2 = random_id_list(rng, n_entries, n_sequences, 40)
+        tuples1, tuples2 = list1.to_tuples(), list2.to_tuples()
+        
+        expected = dict_join(tuples1, tuples2)
+        assert spade.id_list_join(list1, list2).to_tuples() == expected
+        
+        old = best_of(lambda: dict_join(tuples1, tuples2))
+        # Fresh IdList each run so the cached first occurrences are not reused
+        new = best_of(lambda: spade.id_list_join(IdList(list1.sids, list1.eids), list2))
+        print(f"{len(list1):>10,}{old * 1000:>16.2f}{new * 1000:>17.2f}{old / new:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""SPADEAlgorithm.update() on small deltas versus mining from scratch"""
+import sys
+import time
+
+from synthetic import make_transactions
+
+from spade_algorithm import SPADEAlgorithm
+
+
+def mine(df, min_support, incremental=False):
+    spade = SPADEAlgorithm(min_support=min_support, search='dfs', incremental=incremental)
+    spade.preprocess_data(df)
+    spade.find_frequent_sequences()
+    return spade
+
+
+def patterns(frequent_sequences):
+    return {(tuple(map(tuple, sequence)), support) for sequence, support in frequent_sequences}
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    min_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    deltas = (10, 100, 1000)
+    df = make_transactions(n_rows + sum(deltas), seed=1).sample(frac=1, random_state=1)
+    
+    spade = mine(df.iloc[:n_rows], min_support, incremental=True)
+    print(f"{n_rows:,} rows, min_support={min_support}, {len(spade.frequent_sequences):,} patterns, "
+          f"{len(spade.tracked_counts):,} tracked")
+    print(f"{'delta rows':>10}  {'update (s)':>10}  {'re-mine (s)':>11}  speed-up")
+    
+    start = n_rows
+    for delta in deltas:
+        begin = time.perf_counter()
+        result = spade.update(df.iloc[start:start + delta])
+        update_time = time.perf_counter() - begin
+        start += delta
+        
+        begin = time.perf_counter()
+        full = mine(df.iloc[:start], min_support)
+        full_time = time.perf_counter() - begin
+        
+        assert patterns(result) == patterns(full.frequent_sequences)
+        print(f"{delta:>10,}  {update_time:>10.3f}  {full_time:>11.3f}  {full_time / update_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+CSV ingestion: the old whole-file read (inferred dtypes, copy, clean) against
+the chunked reads with CSV_DTYPES, into a cleaned frame and straight into
+the sequence database. Peak memory is measured with tracemalloc (pandas and
+numpy buffers are traced), time in a separate untraced run.
+
+    python benchmarks/bench_ingestion.py [rows] [chunksize]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from synthetic import make_transactions
+
+from data_processing import load_and_process_data, load_sequence_database
+from spade_algorithm import build_sequence_arrays
+
+
+def old_load(path):
+    """data_processing before the chunked reads: read everything, copy, clean"""
+    df = pd.read_csv(path)
+    df = df.copy()
+    df = df.dropna(subset=['CustomerID', 'StockCode', 'InvoiceNo'])
+    df['CustomerID'] = pd.to_numeric(df['CustomerID'], errors='coerce')
+    df = df.dropna(subset=['CustomerID'])
+    df['CustomerID'] = df['CustomerID'].astype(int)
+    df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'], errors='coerce')
+    df = df.dropna(subset=['InvoiceDate'])
+    df = df[df['Quantity'] > 0]
+    return df[df['UnitPrice'] > 0]
+
+
+def measure(function):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    chunksize = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    df = make_transactions(n_rows, seed=4)
+    df['Description'] = "Product " + df['StockCode']
+    df['Country'] = np.where(np.arange(n_rows) % 3, "Vietnam", "United Kingdom")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "transactions.csv")
+        df.to_csv(path, index=False)
+        size = os.path.getsize(path)
+        del df
+
+        runs = [
+            ("old: read_csv + copy + clean", lambda: old_load(path)),
+            ("old + build_sequence_arrays", lambda: build_sequence_arrays(old_load(path))),
+            ("chunked load_and_process_data", lambda: load_and_process_data(path, chunksize)),
+            ("chunked + build_sequence_arrays", lambda: build_sequence_arrays(load_and_process_data(path, chunksize))),
+            ("streamed load_sequence_database", lambda: load_sequence_database(path, chunksize)[0]),
+        ]
+        print(f"{n_rows:,} rows, {size / 2**20:.0f} MB CSV, chunks of {chunksize:,} rows")
+        for name, function in runs:
+            elapsed, peak, result = measure(function)
+            if isinstance(result, pd.DataFrame):
+                detail = f"frame {result.memory_usage(deep=True).sum() / 2**20:6.0f} MB"
+            else:
+                detail = f"{result.sequence_count:,} sequences"
+            print(f"{name:34s} {elapsed:7.2f} s   peak {peak / 2**20:7.0f} MB   {detail}")
+            del result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Scaling of SPADEAlgorithm(n_jobs=...) over first-level equivalence classes.
+
+    python benchmarks/bench_parallel.py [rows] [min_support]
+"""
+import os
+import sys
+import time
+
+from synthetic import make_transactions
+from spade_algorithm import SPADEAlgorithm
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    min_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.03
+    df = make_transactions(n_rows, n_customers=n_rows // 30, n_items=300)
+    print(f"{n_rows:,} rows, min_support={min_support}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'seconds':>10}{'speed-up':>10}{'patterns':>10}")
+    
+    baseline = None
+    for n_jobs in (1, 2, 4, 8, 16):
+        spade = SPADEAlgorithm(min_support, search='dfs', n_jobs=n_jobs)
+        spade.preprocess_data(df)
+        start = time.perf_counter()
+        patterns = spade.find_frequent_sequences()
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{n_jobs:>8}{elapsed:>10.2f}{baseline / elapsed:>9.2f}x{len(patterns):>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Results view: formatting every pattern with DataFrame description lookups
+(the old display_frequent_sequences loop) versus PatternList, which formats
+only the visible page and sorts/filters index arrays. Treeview inserts are
+not timed (no display needed), they only add to the old approach.
+"""
+import sys
+import time
+
+from synthetic import make_transactions
+
+from pattern_view import PatternList
+from spade_algorithm import SPADEAlgorithm
+
+PAGE = 40
+
+
+def old_items(df, sequence):
+    """Items column as built before, one boolean mask per item"""
+    itemsets_desc = []
+    for itemset in sequence:
+        items_desc = []
+        for item in itemset:
+            desc = df[df['StockCode'] == item]['Description'].iloc[0] \
+                if len(df[df['StockCode'] == item]) > 0 else "Unknown"
+            items_desc.append(f"{item}: {desc}")
+        itemsets_desc.append(", ".join(items_desc))
+    return " -> ".join(f"{{{desc}}}" if len(itemset) > 1 else desc
+                       for itemset, desc in zip(sequence, itemsets_desc))
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    min_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    df = make_transactions(n_rows, seed=2)
+    df['Description'] = "Product " + df['StockCode']
+    spade = SPADEAlgorithm(min_support=min_support, search='dfs')
+    spade.preprocess_data(df)
+    sequences = spade.find_frequent_sequences()
+
+    # Old loop, measured on a sample and extrapolated to all patterns
+    sample = sequences[:200]
+    elapsed, _ = timed(lambda: [old_items(df, sequence) for sequence, _ in sample])
+    old_total = elapsed / len(sample) * len(sequences)
+
+    build, descriptions = timed(lambda: dict(zip(*[df.drop_duplicates('StockCode')[column]
+                                                   for column in ('StockCode', 'Description')])))
+    table, patterns = timed(lambda: PatternList(sequences, descriptions))
+    page, _ = timed(lambda: patterns.rows(0, PAGE))
+    sort, _ = timed(lambda: patterns.sort('Support', descending=False))
+    sort_label, _ = timed(lambda: patterns.sort('Sequence'))
+    first_item = sequences[0][0][0][0]
+    item_filter, _ = timed(lambda: patterns.filter(min_support=0.3, min_length=2, items=[first_item]))
+    item_filter_again, _ = timed(lambda: patterns.filter(min_length=3, items=[first_item]))
+    scroll, _ = timed(lambda: [patterns.rows(start, start + PAGE) for start in range(0, 100 * PAGE, PAGE)])
+
+    print(f"{n_rows:,} rows, min_support={min_support}: {len(sequences):,} patterns")
+    print(f"old: format all rows (extrapolated)   {old_total:10.2f} s")
+    print(f"descriptions dict (once per dataset)  {build * 1000:10.1f} ms")
+    print(f"PatternList build                     {table * 1000:10.1f} ms")
+    print(f"first page of {PAGE} rows               {page * 1000:10.2f} ms")
+    print(f"sort by support / by sequence text    {sort * 1000:10.1f} ms / {sort_label * 1000:.1f} ms")
+    print(f"filter support+length+item (first)    {item_filter * 1000:10.1f} ms")
+    print(f"filter length+item (again)            {item_filter_again * 1000:10.1f} ms")
+    print(f"scroll: 100 pages                     {scroll * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Rows/second of SPADEAlgorithm.preprocess_data against the old iterrows loop.
+
+    python benchmarks/bench_preprocess.py
+"""
+import time
+from collections import defaultdict
+
+from synthetic import load_sample, make_transactions
+from spade_algorithm import SPADEAlgorithm
+
+
+def legacy_preprocess(df):
+    """The iterrows-based builder that preprocess_data replaced"""
+    sequence_db = {}
+    vertical_db = defaultdict(list)
+    df_sorted = df.sort_values(by=['CustomerID', 'InvoiceDate'])
+    for customer_id, group in df_sorted.groupby('CustomerID'):
+        sequence = []
+        prev_invoice = None
+        for _, row in group.iterrows():
+            invoice = row['InvoiceNo']
+            item = row['StockCode']
+            if invoice != prev_invoice:
+                sequence.append([item])
+                prev_invoice = invoice
+            elif item not in sequence[-1]:
+                sequence[-1].append(item)
+        sequence_db[customer_id] = sequence
+    for seq_id, sequence in sequence_db.items():
+        for pos, itemset in enumerate(sequence):
+            for item in itemset:
+                vertical_db[item].append((seq_id, pos))
+    return sequence_db, vertical_db
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    datasets = [
+        ("sample_data.csv", load_sample(), True),
+        ("synthetic 100k", make_transactions(100_000), True),
+        ("synthetic 1M", make_transactions(1_000_000), False),
+    ]
+    print(f"{'dataset':<18}{'rows':>10}{'legacy rows/s':>16}{'vectorized rows/s':>20}")
+    for name, df, run_legacy in datasets:
+        repeat = 5 if len(df) < 10_000 else 1
+        new = best_of(lambda: SPADEAlgorithm().preprocess_data(df), repeat)
+        if run_legacy:
+            old = best_of(lambda: legacy_preprocess(df), repeat)
+            old_rate = f"{len(df) / old:,.0f}"
+        else:
+            old_rate = "skipped"
+        print(f"{name:<18}{len(df):>10,}{old_rate:>16}{len(df) / new:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
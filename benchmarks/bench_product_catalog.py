@@ -0,0 +1,47 @@
+"""Description lookups: one boolean-mask scan per code versus a ProductCatalog built once"""
+import sys
+import time
+
+import numpy as np
+
+from synthetic import make_transactions
+
+from product_catalog import ProductCatalog
+
+
+def scan(df, code):
+    """The lookup used before the catalog"""
+    matches = df[df['StockCode'] == code]
+    return matches['Description'].iloc[0] if len(matches) > 0 else "Unknown"
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_lookups = 1_000
+    df = make_transactions(n_rows, seed=3)
+    df['Description'] = "Product " + df['StockCode']
+    codes = np.random.default_rng(0).choice(df['StockCode'].unique(), n_lookups).tolist()
+
+    sample = codes[:20]
+    start = time.perf_counter()
+    expected = [scan(df, code) for code in sample]
+    scan_time = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    catalog = ProductCatalog.from_transactions(df)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [catalog.description(code) for code in codes]
+    lookup_time = (time.perf_counter() - start) / len(codes)
+    assert found[:len(sample)] == expected
+
+    print(f"{n_rows:,} rows, {df['StockCode'].nunique():,} products")
+    print(f"mask scan per lookup:     {scan_time * 1000:10.3f} ms")
+    print(f"catalog build (once):     {build_time * 1000:10.3f} ms")
+    print(f"catalog per lookup:       {lookup_time * 1e6:10.3f} us")
+    print(f"break-even after {build_time / scan_time:.1f} lookups")
+
+
+if __name__ == "__main__":
+    main()
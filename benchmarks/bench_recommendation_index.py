@@ -0,0 +1,58 @@
+"""Next-item recommendations: scanning frequent_sequences per query versus NextItemIndex"""
+import sys
+import time
+
+from synthetic import make_transactions
+
+from recommendation import NextItemIndex, items_after
+from spade_algorithm import SPADEAlgorithm
+
+
+def scan(sequences, target_item, k=20):
+    """One query the way it was answered before the index: a pass over all patterns"""
+    recommendations = {}
+    for seq, support in sequences:
+        for next_item in items_after(seq, target_item):
+            if next_item != target_item:
+                recommendations[next_item] = max(recommendations.get(next_item, 0.0), support)
+    return sorted(recommendations.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    min_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+    n_queries = 50
+    df = make_transactions(n_rows, seed=2)
+    
+    spade = SPADEAlgorithm(min_support=min_support, search='dfs')
+    spade.preprocess_data(df)
+    sequences = spade.find_frequent_sequences()
+    items = [sequence[0][0] for sequence, _ in sequences if len(sequence) == 1][:n_queries]
+    
+    start = time.perf_counter()
+    expected = [scan(sequences, item) for item in items]
+    scan_time = (time.perf_counter() - start) / len(items)
+    
+    start = time.perf_counter()
+    index = NextItemIndex(sequences)
+    build_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    answers = index.recommend_many(items, 20)
+    query_time = (time.perf_counter() - start) / len(items)
+    assert [[(item, support) for item, support, *_ in answer] for answer in answers] == expected
+    
+    baskets = [items[k:k + 3] for k in range(len(items))]
+    start = time.perf_counter()
+    index.recommend_baskets(baskets, 20)
+    basket_time = (time.perf_counter() - start) / len(baskets)
+    
+    print(f"{n_rows:,} rows, min_support={min_support}: {len(sequences):,} patterns")
+    print(f"scan per query:        {scan_time * 1000:10.3f} ms")
+    print(f"index build (once):    {build_time * 1000:10.3f} ms")
+    print(f"index per query:       {query_time * 1000:10.3f} ms")
+    print(f"index per 3-item basket: {basket_time * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
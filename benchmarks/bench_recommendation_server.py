@@ -0,0 +1,177 @@
+"""
+Load test of the recommendation service: p50/p99 latency and QPS.
+
+    python benchmarks/bench_recommendation_server.py                 # mines, starts a local server
+    python benchmarks/bench_recommendation_server.py --url http://127.0.0.1:8000
+
+Clients keep their connection open (HTTP/1.1 keep-alive), each sending one
+request at a time. The GET phase also triggers a /reload halfway through
+to check that a hot swap does not fail any request.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+from synthetic import SRC_DIR, make_transactions
+
+from cli import patterns_frame, write_table
+from spade_algorithm import SPADEAlgorithm
+
+
+async def request(reader, writer, host, method, path, body=None):
+    """One request on an open connection; returns (status, body)"""
+    data = b'' if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, make_request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            method, path, body = make_request()
+            start = time.perf_counter()
+            try:
+                status, _ = await request(reader, writer, host, method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                errors.append('connection')
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def phase(host, port, make_request, concurrency, duration, reload_at=None):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    reloading = asyncio.ensure_future(reload_after(host, port, reload_at)) if reload_at is not None else None
+    await asyncio.gather(*[client(host, port, make_request, deadline, latencies, errors)
+                           for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    reloaded = await reloading if reloading is not None else None
+    return np.array(latencies), errors, elapsed, reloaded
+
+
+async def reload_after(host, port, delay):
+    await asyncio.sleep(delay)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        start = time.perf_counter()
+        status, body = await request(reader, writer, host, 'POST', '/reload')
+        return status, time.perf_counter() - start, json.loads(body).get('version')
+    finally:
+        writer.close()
+
+
+def report(name, latencies, errors, elapsed):
+    p50, p99 = np.percentile(latencies * 1000, [50, 99]) if len(latencies) else (float('nan'),) * 2
+    print(f"{name:<24}  {len(latencies):>8,}  {len(latencies) / elapsed:>8,.0f}  {p50:>8.2f}  {p99:>8.2f}  {len(errors):>6}")
+
+
+def start_local_server(n_rows, min_support, directory):
+    df = make_transactions(n_rows, seed=2)
+    spade = SPADEAlgorithm(min_support=min_support, search='dfs')
+    spade.preprocess_data(df)
+    sequences = spade.find_frequent_sequences()
+    path = os.path.join(directory, 'patterns.jsonl')
+    write_table(patterns_frame(sequences, spade.sequence_count), path, 'jsonl')
+    print(f"{n_rows:,} rows, min_support={min_support}: {len(sequences):,} patterns")
+
+    process = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, 'recommendation_server.py'), path,
+                                '--port', '0'], stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith('Serving'):
+        process.kill()
+        raise RuntimeError(f"server did not start: {line}{process.stderr.read()}")
+    return process, int(line.rsplit(':', 1)[1])
+
+
+async def run(host, port, concurrency, duration, batch_size):
+    items = await fetch_items(host, port) or ['P0']
+    rng = random.Random(0)
+
+    def single():
+        return 'GET', f"/recommend?item={quote(rng.choice(items))}&k=20", None
+
+    def batch():
+        return 'POST', '/recommend', {'items': rng.sample(items, min(batch_size, len(items))), 'k': 20}
+
+    print(f"{concurrency} connections, {duration:.0f} s per phase")
+    print(f"{'phase':<24}  {'requests':>8}  {'QPS':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>6}")
+    latencies, errors, elapsed, reloaded = await phase(host, port, single, concurrency, duration,
+                                                       reload_at=duration / 2)
+    report("GET /recommend", latencies, errors, elapsed)
+    latencies, errors, elapsed, _ = await phase(host, port, batch, concurrency, duration)
+    report(f"POST batch of {batch_size}", latencies, errors, elapsed)
+    status, reload_time, version = reloaded
+    print(f"reload during GET phase: status {status}, {reload_time * 1000:.0f} ms, now serving version {version}")
+
+
+async def fetch_items(host, port):
+    """Items to query: successors listed by the service for a few popular probes"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        found = set()
+        for probe in [f"P{k}" for k in range(50)]:
+            status, body = await request(reader, writer, host, 'GET', f"/recommend?item={probe}&k=50")
+            recommendations = json.loads(body)['recommendations'] if status == 200 else []
+            if recommendations:
+                found.add(probe)
+                found.update(entry['item'] for entry in recommendations)
+        return sorted(found)
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="running service to test (default: start one on a free port)")
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--min-support', type=float, default=0.2)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per phase")
+    parser.add_argument('--batch-size', type=int, default=10)
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as directory:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            process, port = start_local_server(args.rows, args.min_support, directory)
+            host = '127.0.0.1'
+        try:
+            asyncio.run(run(host, port, args.concurrency, args.duration, args.batch_size))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
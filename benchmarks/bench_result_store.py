@@ -0,0 +1,42 @@
+"""Queries at higher supports answered from a ResultStore versus mining again"""
+import shutil
+import sys
+import tempfile
+import time
+
+from synthetic import make_transactions
+
+from result_store import ResultStore
+from spade_algorithm import SPADEAlgorithm
+
+
+def run(df, min_support, store=None):
+    spade = SPADEAlgorithm(min_support=min_support, search='dfs', result_store=store)
+    spade.preprocess_data(df)
+    start = time.perf_counter()
+    result = spade.find_frequent_sequences()
+    return time.perf_counter() - start, result
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    base_support = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    df = make_transactions(n_rows, seed=2)
+    directory = tempfile.mkdtemp()
+    try:
+        store = ResultStore(directory)
+        seconds, result = run(df, base_support, store)
+        print(f"{n_rows:,} rows, base run at {base_support}: {len(result):,} patterns in {seconds:.2f} s")
+        print(f"{'min_support':>11}  {'patterns':>8}  {'mine (s)':>8}  {'store (s)':>9}  {'cold store (s)':>14}")
+        for min_support in (base_support, base_support + 0.05, base_support + 0.1, base_support + 0.2):
+            mine_time, expected = run(df, min_support)
+            store_time, result = run(df, min_support, store)
+            cold_time, cold = run(df, min_support, ResultStore(directory))
+            assert result == expected and cold == expected
+            print(f"{min_support:>11.2f}  {len(result):>8,}  {mine_time:>8.3f}  {store_time:>9.4f}  {cold_time:>14.4f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Preprocessing cost with and without the SequenceCache"""
+import shutil
+import sys
+import tempfile
+import time
+
+from synthetic import make_transactions
+
+from sequence_cache import SequenceCache
+from spade_algorithm import SPADEAlgorithm
+
+
+def timed_preprocess(df, cache=None):
+    spade = SPADEAlgorithm(min_support=0.3)
+    start = time.perf_counter()
+    spade.preprocess_data(df, cache=cache)
+    return time.perf_counter() - start, spade
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = make_transactions(n_rows)
+    directory = tempfile.mkdtemp()
+    try:
+        uncached, reference = timed_preprocess(df)
+        cache = SequenceCache(directory)
+        first, _ = timed_preprocess(df, cache)
+        warm, _ = timed_preprocess(df, cache)
+        cold, spade = timed_preprocess(df, SequenceCache(directory))
+    finally:
+        shutil.rmtree(directory)
+    
+    # The cached database must mine exactly like a fresh one
+    assert spade.find_frequent_sequences() == reference.find_frequent_sequences()
+    
+    print(f"{n_rows:,} rows")
+    print(f"{'no cache':>28}: {uncached:.3f} s")
+    print(f"{'first run (build + write)':>28}: {first:.3f} s")
+    print(f"{'same session (memory)':>28}: {warm:.3f} s")
+    print(f"{'cold start (disk)':>28}: {cold:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Top-k mining versus a fixed min_support (a low guess and the ideal one)"""
+import sys
+import time
+
+from synthetic import make_transactions
+
+from spade_algorithm import SPADEAlgorithm
+
+
+def run(df, **options):
+    spade = SPADEAlgorithm(search='dfs', **options)
+    spade.preprocess_data(df)
+    start = time.perf_counter()
+    result = spade.find_frequent_sequences()
+    return time.perf_counter() - start, result, spade.stats['candidates']
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    floor = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    min_length = 2
+    df = make_transactions(n_rows, seed=3)
+    
+    guess_time, guessed, guess_candidates = run(df, min_support=floor, min_length=min_length)
+    print(f"{n_rows:,} rows, min_length={min_length}; fixed min_support={floor}: "
+          f"{len(guessed):,} patterns, {guess_candidates:,} candidates, {guess_time:.2f} s")
+    print(f"{'k':>6}  {'top-k (s)':>9}  {'candidates':>10}  {'k-th support':>12}  {'ideal fixed (s)':>15}")
+    for k in (10, 100, 1000):
+        top_time, top, candidates = run(df, min_support=floor, top_k=k, min_length=min_length)
+        assert [support for _, support in top] == [support for _, support in guessed[:k]]
+        
+        # Best case for a fixed threshold: knowing the k-th support in advance
+        ideal_time, _, _ = run(df, min_support=top[-1][1], min_length=min_length)
+        print(f"{k:>6,}  {top_time:>9.3f}  {candidates:>10,}  {top[-1][1]:>12.3f}  {ideal_time:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Loading cleaned transactions: the CSV (chunked read + clean_data) against a
+saved transaction set (memory-mapped .npy columns, or Feather with pyarrow),
+whole or projected on the sequence columns, and on to the sequence
+database. Every case runs in a fresh process; peak memory is its maximum
+resident set size (mapped pages count once they are read).
+
+    python benchmarks/bench_transaction_store.py [rows ...]
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import make_transactions
+
+from data_processing import load_and_process_data, load_sequence_database
+from spade_algorithm import SEQUENCE_COLUMNS, build_sequence_arrays
+from transaction_store import default_format, load_transactions, save_transactions
+
+BLOCK_ROWS = 1_000_000
+
+CASES = {
+    'csv': lambda csv, store: load_and_process_data(csv),
+    'set': lambda csv, store: load_transactions(store),
+    'set, sequence columns': lambda csv, store: load_transactions(store, SEQUENCE_COLUMNS),
+    'csv -> database (streamed)': lambda csv, store: load_sequence_database(csv)[0],
+    'set -> database': lambda csv, store: build_sequence_arrays(load_transactions(store, SEQUENCE_COLUMNS)),
+}
+
+
+def write_csv(path, n_rows):
+    """Synthetic transactions written a block at a time, with disjoint customers and invoices per block"""
+    for k, start in enumerate(range(0, n_rows, BLOCK_ROWS)):
+        df = make_transactions(min(BLOCK_ROWS, n_rows - start), seed=k)
+        df['InvoiceNo'] += k * BLOCK_ROWS
+        df['CustomerID'] += k * BLOCK_ROWS
+        df['Description'] = "Product " + df['StockCode']
+        df.to_csv(path, index=False, mode='w' if k == 0 else 'a', header=k == 0)
+
+
+def touch(frame):
+    """Read every byte of the array columns, so that mapped columns are paged in"""
+    for column in frame.columns:
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.codes
+        values = values.to_numpy()
+        if values.dtype.kind in 'biufM':
+            np.ascontiguousarray(values).view(np.uint8).max()
+
+
+def peak_rss_mb():
+    """High-water resident set size of this process; VmHWM starts over at exec, ru_maxrss does not"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(name, csv, store):
+    """Child process: one load, prints seconds and peak RSS"""
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    result = CASES[name](csv, store)
+    if isinstance(result, pd.DataFrame):
+        touch(result)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'baseline_mb': baseline, 'peak_mb': peak_rss_mb()}))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000_000, 10_000_000]
+    fmt = default_format()
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            csv = os.path.join(directory, "transactions.csv")
+            store = os.path.join(directory, "transactions.tx")
+            write_csv(csv, n_rows)
+            df = load_and_process_data(csv)
+            start = time.perf_counter()
+            save_transactions(df, store)
+            save = time.perf_counter() - start
+            del df
+            store_size = sum(entry.stat().st_size for entry in os.scandir(store))
+
+            print(f"{n_rows:,} rows: CSV {os.path.getsize(csv) / 2**20:.0f} MB, "
+                  f"{fmt} set {store_size / 2**20:.0f} MB (saved in {save:.2f} s)")
+            for name in CASES:
+                output = subprocess.run([sys.executable, __file__, '--case', name, csv, store],
+                                        check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.splitlines()[-1])
+                print(f"  {name:28s} {result['seconds']:7.2f} s   peak RSS {result['peak_mb']:7.0f} MB "
+                      f"(imports {result['baseline_mb']:.0f} MB)")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--case']:
+        run_case(*sys.argv[2:5])
+    else:
+        main()
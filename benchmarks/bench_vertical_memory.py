@@ -0,0 +1,46 @@
+"""
+Memory of the vertical database: int32 IdList arrays against the old
+defaultdict(list) of (CustomerID, pos) tuples.
+
+    python benchmarks/bench_vertical_memory.py
+"""
+import tracemalloc
+
+from synthetic import make_transactions
+from spade_algorithm import SPADEAlgorithm
+
+
+def traced(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    for n_rows in (100_000, 1_000_000):
+        df = make_transactions(n_rows)
+        spade = SPADEAlgorithm()
+        spade.preprocess_data(df)
+        customers = spade.database.customers.tolist()
+        
+        def legacy():
+            return {item: [(customers[sid], eid) for sid, eid in id_list.to_tuples()]
+                    for item, id_list in spade.vertical_db.items()}
+        
+        def compact():
+            return {item: type(id_list)(id_list.sids.copy(), id_list.eids.copy())
+                    for item, id_list in spade.vertical_db.items()}
+        
+        _, legacy_bytes = traced(legacy)
+        _, compact_bytes = traced(compact)
+        occurrences = sum(len(id_list) for id_list in spade.vertical_db.values())
+        print(f"{n_rows:>10,} rows  {occurrences:>10,} occurrences  "
+              f"tuples {legacy_bytes / occurrences:6.1f} B/occ  "
+              f"IdList {compact_bytes / occurrences:5.1f} B/occ  "
+              f"({legacy_bytes / compact_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Synthetic Online-Retail-style transactions for the benchmarks"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Benchmarks import the application modules the same way main.py does
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+sys.path.insert(0, SRC_DIR)
+
+
+def make_transactions(n_rows, n_customers=None, n_items=2000, items_per_invoice=4, seed=0):
+    """Generate a cleaned transaction frame with n_rows rows"""
+    rng = np.random.default_rng(seed)
+    if n_customers is None:
+        n_customers = max(n_rows // 50, 1)
+    n_invoices = max(n_rows // items_per_invoice, 1)
+    
+    # Each invoice belongs to one customer and has one timestamp
+    invoice_customer = rng.integers(0, n_customers, n_invoices)
+    invoice_date = pd.Timestamp("2023-01-01") + pd.to_timedelta(
+        rng.integers(0, 365 * 24 * 60, n_invoices), unit="min")
+    
+    invoice = rng.integers(0, n_invoices, n_rows)
+    # Zipf-like popularity so that some items are frequent
+    item = np.minimum(rng.zipf(1.3, n_rows) - 1, n_items - 1)
+    
+    return pd.DataFrame({
+        "InvoiceNo": invoice + 100000,
+        "StockCode": np.char.add("P", item.astype(str)).astype(object),
+        "Description": "Product",
+        "Quantity": rng.integers(1, 10, n_rows),
+        "InvoiceDate": invoice_date[invoice],
+        "UnitPrice": 1.0,
+        "CustomerID": invoice_customer[invoice] + 10000,
+        "Country": "Vietnam",
+    })
+
+
+def load_sample():
+    """Cleaned data/sample_data.csv"""
+    from data_processing import load_and_process_data
+    return load_and_process_data(os.path.join(DATA_DIR, "sample_data.csv"))
+
+
+def scale_sample(df, factor):
+    """Replicate the sample data factor times with disjoint customers and invoices"""
+    parts = []
+    customer_span = int(df["CustomerID"].max()) + 1
+    for k in range(factor):
+        part = df.copy()
+        part["CustomerID"] = part["CustomerID"] + k * customer_span
+        part["InvoiceNo"] = part["InvoiceNo"].astype(str) + "-" + str(k)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
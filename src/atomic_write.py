@@ -0,0 +1,71 @@
+"""
+Files and directories written in full or not at all.
+
+atomic_write yields a temporary path next to the target, in the same
+directory so that the final rename stays on one file system. The target is
+replaced only when the block completes, so readers never see a partial
+file, and the temporary path is removed when the block raises.
+
+The on-disk caches bound their size with touch and remove_oldest: an entry
+is touched when it is read, and the least recently used ones are removed
+after a write.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def touch(path):
+    """Mark path as recently used (its modification time)"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def remove_oldest(paths, keep):
+    """Remove all but the keep most recently modified of paths"""
+    modified = []
+    for path in paths:
+        try:
+            modified.append((os.path.getmtime(path), path))
+        except OSError:
+            # Removed meanwhile, e.g. by another process pruning the same cache
+            pass
+    modified.sort(reverse=True)
+    for _, path in modified[keep:]:
+        try:
+            _remove(path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def atomic_write(path, directory=False, suffix=''):
+    """
+    Path to write path's content to: a temporary file, or an empty directory
+    if directory is true. An existing directory at path is replaced.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    if directory:
+        staging = tempfile.mkdtemp(dir=parent, suffix=suffix)
+    else:
+        fd, staging = tempfile.mkstemp(dir=parent, suffix=suffix)
+        os.close(fd)
+    try:
+        yield staging
+        if directory and os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(staging, path)
+    except BaseException:
+        _remove(staging)
+        raise
@@ -0,0 +1,135 @@
+import numpy as np
+
+WORD_BITS = 64
+ALL_ONES = np.uint64(0xFFFFFFFFFFFFFFFF)
+ONE = np.uint64(1)
+
+
+class SequenceBitmap:
+    """
+    SPAM-style vertical representation of one pattern.
+
+    Stores one packed bit vector per customer sequence that contains the
+    pattern: bit e of row r is set when the pattern ends in itemset e of
+    sequence sids[r]. Rows are uint64 words, all sequences use the same
+    number of words so joins are plain array operations.
+    """
+    __slots__ = ('sids', 'words', '_after')
+    fields = ('sids', 'words')
+
+    def __init__(self, sids, words):
+        self.sids = sids        # sorted sids with at least one bit set
+        self.words = words      # uint64 array of shape (len(sids), words per sequence)
+        self._after = None
+
+    def __len__(self):
+        return int(np.count_nonzero(self.words))
+
+    @property
+    def nbytes(self):
+        return self.sids.nbytes + self.words.nbytes
+
+    def support_count(self):
+        """Number of distinct sequences in the bitmap"""
+        return len(self.sids)
+
+    def sequence_ids(self):
+        """Sorted distinct sids"""
+        return self.sids
+
+    def after_first(self):
+        """
+        S-step transform: for every sequence keep all bits strictly after the
+        first set bit. Cached, since a prefix is joined with all its siblings.
+        """
+        if self._after is not None:
+            return self._after
+        rows = np.arange(len(self.sids))
+        first_word = (self.words != 0).argmax(axis=1)
+        word = self.words[rows, first_word]
+
+        # Lowest set bit, then every bit above it
+        lowest = word & (~word + ONE)
+        above = ~(lowest | (lowest - ONE))
+
+        columns = np.arange(self.words.shape[1])
+        transformed = np.where(columns > first_word[:, None], ALL_ONES, np.uint64(0))
+        transformed[rows, first_word] = above
+        self._after = transformed
+        return transformed
+
+    def sequence_join(self, other, min_count=0):
+        """
+        Temporal join by shift-and-AND: bits of other after the first bit of
+        self. Returns None when fewer than min_count sequences are in both.
+        """
+        rows1, rows2 = self._match_rows(other)
+        if len(rows1) < min_count:
+            return None
+        words = self.after_first()[rows1] & other.words[rows2]
+        return self._drop_empty(self.sids[rows1], words)
+
+    def itemset_join(self, other, min_count=0):
+        """I-step join: AND of the rows of both bitmaps"""
+        rows1, rows2 = self._match_rows(other)
+        if len(rows1) < min_count:
+            return None
+        words = self.words[rows1] & other.words[rows2]
+        return self._drop_empty(self.sids[rows1], words)
+
+    def has_entries_of(self, other):
+        """True if other, a bitmap joined from this one, kept all its bits"""
+        return len(other.sids) == len(self.sids) and np.array_equal(other.words, self.words)
+
+    def _match_rows(self, other):
+        """Rows of self and other that belong to the same sequences (sorted merge)"""
+        if len(other.sids) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        idx = np.searchsorted(other.sids, self.sids)
+        np.minimum(idx, len(other.sids) - 1, out=idx)
+        rows1 = np.flatnonzero(other.sids[idx] == self.sids)
+        return rows1, idx[rows1]
+
+    @staticmethod
+    def _drop_empty(sids, words):
+        keep = words.any(axis=1)
+        return SequenceBitmap(sids[keep], words[keep])
+
+    def to_tuples(self):
+        """(sid, eid) pairs, mainly for debugging"""
+        rows, columns = np.nonzero(self.words)
+        pairs = []
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            word = int(self.words[row, column])
+            for bit in range(WORD_BITS):
+                if word >> bit & 1:
+                    pairs.append((int(self.sids[row]), column * WORD_BITS + bit))
+        return pairs
+
+
+def words_per_sequence(max_length):
+    """Number of uint64 words needed for a sequence of max_length itemsets"""
+    return max(-(-max_length // WORD_BITS), 1)
+
+
+def id_list_to_bitmap(id_list, n_words):
+    """Pack an IdList (sorted by sid, eid) into a SequenceBitmap"""
+    sids, rows = np.unique(id_list.sids, return_inverse=True)
+    words = np.zeros((len(sids), n_words), dtype=np.uint64)
+    eids = id_list.eids.astype(np.uint64)
+    np.bitwise_or.at(words, (rows, (eids // WORD_BITS).astype(np.intp)),
+                     ONE << (eids % np.uint64(WORD_BITS)))
+    return SequenceBitmap(sids, words)
+
+
+def bitmap_density(id_lists, n_words):
+    """
+    Fraction of set bits if id_lists were stored as bitmaps. A bitmap row
+    costs n_words * 8 bytes and an id-list entry 8 bytes, so bitmaps are no
+    larger than id-lists once density >= 1 / WORD_BITS.
+    """
+    occurrences = sum(len(id_list) for id_list in id_lists)
+    rows = sum(id_list.support_count() for id_list in id_lists)
+    if rows == 0:
+        return 0.0
+    return occurrences / (rows * n_words * WORD_BITS)
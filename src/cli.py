@@ -0,0 +1,291 @@
+"""
+Headless command-line entry point for the mining pipeline.
+
+    python -m src.cli mine data.csv --min-support 0.01 --out patterns.csv
+    python src/cli.py mine data.csv --output closed --out - > patterns.jsonl
+    python src/cli.py convert data.csv data.tx && python src/cli.py mine data.tx --out patterns.csv
+
+Runs load -> clean -> SPADE (-> rules) without the GUI: only pandas, numpy
+and the mining modules are imported. The CSV is read and cleaned in chunks
+of --chunksize rows that go straight into the sequence database, so the
+whole file is never in memory (with --cache the cleaned frame is kept to
+key the cache). `convert` saves the cleaned rows as a binary transaction set
+(see transaction_store) that `mine` reads without parsing the CSV again.
+Progress goes to stderr, results to --out (.csv, .json,
+.jsonl or .parquet, which needs pyarrow or fastparquet; '-' for JSON lines
+on stdout).
+
+Exit codes: 0 success, 1 missing input or error while mining or writing,
+2 bad arguments, 3 no usable rows in the input.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+# The application modules use flat imports (as when main.py runs from src/)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_processing import CHUNK_ROWS, load_and_process_data, load_sequence_database
+from spade_algorithm import SPADEAlgorithm
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_NO_DATA = 3
+
+FORMATS = ('csv', 'json', 'jsonl', 'parquet')
+
+
+class Progress:
+    """Timestamped stage messages on stderr"""
+    # Seconds between two mining progress lines
+    MINING_INTERVAL = 5.0
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.start = time.perf_counter()
+        self.last_mining = self.start
+
+    def __call__(self, message):
+        if not self.quiet:
+            print(f"[{time.perf_counter() - self.start:8.2f}s] {message}", file=sys.stderr, flush=True)
+
+    def mining(self, info):
+        """Progress callback of SPADEAlgorithm"""
+        now = time.perf_counter()
+        if info.stage == 'items':
+            self("Frequent items found, mining longer patterns")
+        elif info.stage == 'mining' and now - self.last_mining >= self.MINING_INTERVAL:
+            self.last_mining = now
+            self(f"~{info.fraction:.0%} mined, length-{info.level} patterns: "
+                 f"{info.candidates:,} candidates, {info.patterns:,} found")
+
+
+def output_format(path, requested=None):
+    """Format from --format or the file extension ('-' is JSON lines)"""
+    if requested:
+        return requested
+    if path == '-':
+        return 'jsonl'
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the output format of {path}; use --format ({', '.join(FORMATS)})")
+    return extension
+
+
+def check_writer(fmt):
+    """Raise ImportError if results cannot be written in fmt, before anything is mined"""
+    if fmt != 'parquet':
+        return
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(engine)
+            return
+        except ImportError:
+            pass
+    raise ImportError("Writing .parquet needs pyarrow or fastparquet; use .csv, .json or .jsonl instead")
+
+
+def check_input(path):
+    """Raise FileNotFoundError for a missing input, which would otherwise read as no rows"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such file: {path}")
+
+
+def patterns_frame(frequent_sequences, sequence_count):
+    """frequent_sequences as a flat table: JSON-encoded sequence, support, count, length"""
+    return pd.DataFrame({
+        'sequence': [json.dumps(sequence, default=str) for sequence, _ in frequent_sequences],
+        'support': [support for _, support in frequent_sequences],
+        'count': [round(support * sequence_count) for _, support in frequent_sequences],
+        'length': [sum(map(len, sequence)) for sequence, _ in frequent_sequences],
+    })
+
+
+def write_table(frame, path, fmt):
+    """Write a results table; sequences stay JSON strings in every format"""
+    if fmt == 'csv':
+        frame.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        # Needs pyarrow or fastparquet (see check_writer)
+        frame.to_parquet(path, index=False)
+    else:
+        records = frame.to_dict(orient='records')
+        for record in records:
+            for column in ('sequence', 'antecedent', 'consequent'):
+                if column in record:
+                    record[column] = json.loads(record[column])
+        stream = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+        try:
+            if fmt == 'json':
+                json.dump(records, stream, default=str)
+                stream.write('\n')
+            else:
+                for record in records:
+                    stream.write(json.dumps(record, default=str) + '\n')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+
+def read_patterns(path, fmt=None):
+    """frequent_sequences back from a file written by `mine` ('-' reads JSON lines from stdin)"""
+    fmt = output_format(path, fmt)
+    if fmt in ('csv', 'parquet'):
+        frame = pd.read_csv(path, dtype={'sequence': str}) if fmt == 'csv' else pd.read_parquet(path)
+        return [(json.loads(sequence), float(support))
+                for sequence, support in zip(frame['sequence'], frame['support'])]
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        if fmt == 'json':
+            records = json.load(stream)
+        else:
+            records = [json.loads(line) for line in stream if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return [(record['sequence'], float(record['support'])) for record in records]
+
+
+def mine(args, parser):
+    progress = Progress(args.quiet)
+    if not 0 < args.min_support <= 1:
+        parser.error("--min-support must be in (0, 1]")
+    try:
+        fmt = output_format(args.out, args.format)
+        rules_fmt = output_format(args.rules, args.format) if args.rules else None
+        spade = SPADEAlgorithm(min_support=args.min_support, search=args.search, engine=args.engine,
+                               n_jobs=args.n_jobs, top_k=args.top_k, min_length=args.min_length,
+                               output=args.output, max_length=args.max_length, min_gap=args.min_gap,
+                               max_gap=args.max_gap, max_window=args.max_window,
+                               result_store=_result_store(args.cache), progress=progress.mining)
+    except ValueError as e:
+        # Unknown format or options that cannot be combined
+        parser.error(str(e))
+    check_writer(fmt)
+    check_writer(rules_fmt)
+    check_input(args.input)
+
+    progress(f"Loading and cleaning {args.input}")
+    if args.cache is None:
+        database, rows = load_sequence_database(args.input, args.chunksize)
+        spade.load_database(database)
+    else:
+        df = load_and_process_data(args.input, args.chunksize)
+        rows = len(df)
+        if rows:
+            spade.preprocess_data(df, cache=_sequence_cache(args.cache))
+    if not rows:
+        progress("No usable rows in the input")
+        return EXIT_NO_DATA
+    progress(f"{rows:,} rows after cleaning")
+    progress(f"Sequence database: {spade.sequence_count:,} customers, {len(spade.database):,} item occurrences")
+
+    frequent_sequences = spade.find_frequent_sequences()
+    progress(f"Found {len(frequent_sequences):,} frequent sequences "
+             f"({spade.stats['candidates']:,} candidates, engine={spade.selected_engine or 'stored'})")
+
+    write_table(patterns_frame(frequent_sequences, spade.sequence_count), args.out, fmt)
+    progress(f"Patterns written to {'stdout' if args.out == '-' else args.out}")
+
+    if args.rules:
+        from recommendation import sequence_rules
+
+        rules = sequence_rules(frequent_sequences, args.min_confidence)
+        for column in ('antecedent', 'consequent'):
+            rules[column] = [json.dumps(part, default=str) for part in rules[column]]
+        write_table(rules, args.rules, rules_fmt)
+        progress(f"{len(rules):,} rules with confidence >= {args.min_confidence} written to {args.rules}")
+    return EXIT_OK
+
+
+def convert(args, parser):
+    from transaction_store import save_transactions
+
+    progress = Progress(args.quiet)
+    check_input(args.input)
+    progress(f"Loading and cleaning {args.input}")
+    df = load_and_process_data(args.input, args.chunksize)
+    if df.empty:
+        progress("No usable rows in the input")
+        return EXIT_NO_DATA
+    save_transactions(df, args.out, args.format)
+    progress(f"{len(df):,} rows saved to {args.out}")
+    return EXIT_OK
+
+
+def _sequence_cache(directory):
+    if directory is None:
+        return None
+    from sequence_cache import SequenceCache
+    return SequenceCache(directory)
+
+
+def _result_store(directory):
+    if directory is None:
+        return None
+    from result_store import ResultStore
+    return ResultStore(os.path.join(directory, 'results'))
+
+
+def _time_span(value):
+    """Gap/window argument: a number of days or a pandas Timedelta string ('36h')"""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='spade', description="Headless SPADE sequential pattern mining")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    mine_parser = commands.add_parser('mine', help="mine frequent sequences from a transactions CSV")
+    mine_parser.add_argument('input', help="transactions CSV (InvoiceNo, StockCode, InvoiceDate, CustomerID, ...) "
+                                           "or a transaction set saved by convert")
+    mine_parser.add_argument('--out', required=True, help="output file (.csv, .json, .jsonl, .parquet) or - for stdout")
+    mine_parser.add_argument('--format', choices=FORMATS, help="output format (default: from the file extension)")
+    mine_parser.add_argument('--min-support', type=float, default=0.01)
+    mine_parser.add_argument('--search', choices=('bfs', 'dfs'), default='dfs')
+    mine_parser.add_argument('--engine', choices=('auto', 'idlist', 'bitmap'), default='auto')
+    mine_parser.add_argument('--n-jobs', type=int, default=1, help="worker processes (-1 for all CPUs)")
+    mine_parser.add_argument('--top-k', type=int, help="keep only the k most frequent patterns")
+    mine_parser.add_argument('--min-length', type=int, default=1)
+    mine_parser.add_argument('--max-length', type=int)
+    mine_parser.add_argument('--output', choices=('all', 'closed', 'maximal'), default='all')
+    mine_parser.add_argument('--min-gap', type=_time_span, help="days or a Timedelta string such as 12h")
+    mine_parser.add_argument('--max-gap', type=_time_span)
+    mine_parser.add_argument('--max-window', type=_time_span)
+    mine_parser.add_argument('--rules', help="also write sequential rules (confidence, lift) to this file")
+    mine_parser.add_argument('--min-confidence', type=float, default=0.0)
+    mine_parser.add_argument('--cache', help="directory for the sequence-database and result caches")
+    mine_parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help="CSV rows read at a time")
+    mine_parser.add_argument('--quiet', action='store_true', help="no progress messages")
+    mine_parser.set_defaults(handler=mine)
+
+    convert_parser = commands.add_parser('convert', help="save the cleaned rows of a CSV as a binary transaction set")
+    convert_parser.add_argument('input', help="transactions CSV")
+    convert_parser.add_argument('out', help="transaction set directory (replaced if it exists)")
+    convert_parser.add_argument('--format', choices=('feather', 'npy'),
+                                help="default: feather with pyarrow installed, npy otherwise")
+    convert_parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help="CSV rows read at a time")
+    convert_parser.add_argument('--quiet', action='store_true', help="no progress messages")
+    convert_parser.set_defaults(handler=convert)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args, parser)
+    except (ValueError, OSError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
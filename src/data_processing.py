@@ -1,18 +1,80 @@
 import pandas as pd
 import numpy as np
 import os
+from pandas.api.types import union_categoricals
 
-def load_data(file_path):
+from transaction_store import is_transaction_set, load_transactions
+
+# Column types of an Online Retail export. Repeated codes and names are
+# categories. CustomerID is read as text and numbers are left to read_csv:
+# a forced numeric dtype makes one malformed cell fail the whole read,
+# while clean_data coerces it and drops only its row. CustomerID becomes
+# int32 once clean_data has dropped the blank ids. Columns missing from a
+# file are ignored.
+CSV_DTYPES = {
+    'InvoiceNo': str,
+    'StockCode': 'category',
+    'Description': 'category',
+    'CustomerID': str,
+    'Country': 'category',
+}
+
+# Rows read at a time: about 30 MB of raw rows
+CHUNK_ROWS = 200_000
+
+
+def read_chunks(file_path, chunksize=CHUNK_ROWS, usecols=None):
+    """Raw rows of the CSV, chunksize at a time, typed with CSV_DTYPES"""
+    return pd.read_csv(file_path, dtype=CSV_DTYPES, chunksize=chunksize, usecols=usecols)
+
+
+def read_transactions(file_path, chunksize=CHUNK_ROWS, usecols=None):
+    """Cleaned rows of the CSV, one chunk at a time (nothing if the file does not exist)"""
+    if not os.path.exists(file_path):
+        print(f"Warning: File {file_path} not found.")
+        return
+    with read_chunks(file_path, chunksize, usecols) as reader:
+        for chunk in reader:
+            chunk = clean_data(chunk)
+            if not chunk.empty:
+                yield chunk
+
+
+def concat_chunks(chunks):
+    """
+    One frame from chunks read with CSV_DTYPES. Every chunk has its own
+    categories, so category columns are unioned (sorted, like those of a
+    single read) instead of falling back to object.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    columns = {}
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals([chunk[column] for chunk in chunks], sort_categories=True)
+        else:
+            columns[column] = pd.concat([chunk[column] for chunk in chunks], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def load_data(file_path, chunksize=CHUNK_ROWS):
     """Load data from CSV file"""
     try:
         # Check if file exists
         if not os.path.exists(file_path):
             print(f"Warning: File {file_path} not found.")
             return pd.DataFrame()
-        
+
+        # A saved transaction set is already typed (and cleaned)
+        if is_transaction_set(file_path):
+            return load_transactions(file_path)
+
         # Load the data
-        df = pd.read_csv(file_path)
-        return df
+        with read_chunks(file_path, chunksize) as reader:
+            return concat_chunks(reader)
     except Exception as e:
         print(f"Error loading data: {e}")
         return pd.DataFrame()
@@ -21,37 +83,58 @@ def clean_data(df):
     """Clean the dataset"""
     if df.empty:
         return df
-    
-    # Make a copy to avoid modifying the original
-    cleaned_df = df.copy()
-    
-    # Handle missing values
-    cleaned_df = cleaned_df.dropna(subset=['CustomerID', 'StockCode', 'InvoiceNo'])
-    
+
+    # Handle missing values (dropna returns a new frame, the input is not modified)
+    cleaned_df = df.dropna(subset=['CustomerID', 'StockCode', 'InvoiceNo'])
+
     # Convert data types
     if 'CustomerID' in cleaned_df.columns:
         cleaned_df['CustomerID'] = pd.to_numeric(cleaned_df['CustomerID'], errors='coerce')
         cleaned_df = cleaned_df.dropna(subset=['CustomerID'])
-        cleaned_df['CustomerID'] = cleaned_df['CustomerID'].astype(int)
-    
+        cleaned_df['CustomerID'] = cleaned_df['CustomerID'].astype(np.int32)
+
     # Convert InvoiceDate to datetime
     if 'InvoiceDate' in cleaned_df.columns:
         cleaned_df['InvoiceDate'] = pd.to_datetime(cleaned_df['InvoiceDate'], errors='coerce')
         cleaned_df = cleaned_df.dropna(subset=['InvoiceDate'])
-    
-    # Remove rows with negative or zero quantities
-    if 'Quantity' in cleaned_df.columns:
-        cleaned_df = cleaned_df[cleaned_df['Quantity'] > 0]
-        
-    # Remove rows with negative or zero prices
-    if 'UnitPrice' in cleaned_df.columns:
-        cleaned_df = cleaned_df[cleaned_df['UnitPrice'] > 0]
-    
+
+    # Remove cancelled invoices (those starting with 'C', i.e. from 'C' up to 'D'
+    # in text order: two comparisons instead of a startswith call per row)
+    invoices = cleaned_df['InvoiceNo'].astype(str).to_numpy(dtype=object)
+    cleaned_df = cleaned_df[~((invoices >= 'C') & (invoices < 'D'))]
+
+    # Remove rows with negative, zero or malformed quantities and prices
+    for column in ('Quantity', 'UnitPrice'):
+        if column in cleaned_df.columns:
+            cleaned_df[column] = pd.to_numeric(cleaned_df[column], errors='coerce')
+            cleaned_df = cleaned_df[cleaned_df[column] > 0]
+
     return cleaned_df
 
-def load_and_process_data(file_path):
-    """Load and clean data from CSV file"""
-    df = load_data(file_path)
-    if not df.empty:
-        df = clean_data(df)
-    return df
\ No newline at end of file
+def load_and_process_data(file_path, chunksize=CHUNK_ROWS):
+    """Load and clean data from CSV file, one chunk at a time, or from a saved transaction set"""
+    try:
+        if is_transaction_set(file_path):
+            return load_transactions(file_path)
+        return concat_chunks(read_transactions(file_path, chunksize))
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return pd.DataFrame()
+
+def load_sequence_database(file_path, chunksize=CHUNK_ROWS):
+    """
+    SequenceDatabase of a CSV without keeping its rows: every cleaned chunk is
+    encoded by a SequenceDatabaseBuilder and dropped. Returns (database,
+    number of cleaned rows). A transaction set is read with its sequence
+    columns only.
+    """
+    from spade_algorithm import SEQUENCE_COLUMNS, SequenceDatabaseBuilder, build_sequence_arrays
+
+    if is_transaction_set(file_path):
+        df = load_transactions(file_path, columns=SEQUENCE_COLUMNS)
+        return build_sequence_arrays(df), len(df)
+    builder = SequenceDatabaseBuilder()
+    columns = SEQUENCE_COLUMNS + ['Quantity', 'UnitPrice']     # what the builder and clean_data read
+    for chunk in read_transactions(file_path, chunksize, usecols=lambda column: column in columns):
+        builder.add(chunk)
+    return builder.build(), builder.rows
@@ -4,13 +4,20 @@ import pandas as pd
 from datetime import datetime
 from PIL import Image, ImageTk
 import os
+import queue
+import threading
 import sv_ttk  # Thư viện theme hiện đại cho tkinter
 from tkcalendar import DateEntry  # Add this import for date picker
 
-from data_processing import load_and_process_data
-from spade_algorithm import SPADEAlgorithm
+from data_processing import clean_data, concat_chunks, load_and_process_data, read_chunks
+from spade_algorithm import MiningCancelled, SPADEAlgorithm
+from sequence_cache import SequenceCache
+from result_store import ResultStore
 from visualization import create_visualizations
-from recommendation import generate_recommendations_from_sequences
+from recommendation import NextItemIndex
+from pattern_view import PatternTable
+from product_catalog import ProductCatalog
+from transaction_store import TransactionStore, is_transaction_set, load_transactions
 
 class SPADEApp(tk.Tk):
     def __init__(self):
@@ -34,8 +41,28 @@ class SPADEApp(tk.Tk):
         
         self.data = None
         self.cleaned_data = None
+        # StockCode -> Description of the cleaned data, rebuilt by clean_data
+        self.catalog = ProductCatalog()
         self.spade = None
+        # Next-item lookup table over the mined sequences, rebuilt after each run
+        self.recommendation_index = None
         self.standard_products = None
+        # Cleaned transactions of the CSVs loaded before, saved in binary form;
+        # data_source is the CSV whose rows are in self.data, None when they came from a saved set;
+        # loaded_path is the file picked in either case
+        self.transaction_store = TransactionStore()
+        self.data_source = None
+        self.loaded_path = None
+        # Preprocessed sequence databases, reused when only min_support changes
+        self.sequence_cache = SequenceCache()
+        # Mined results by database; higher supports are answered by filtering
+        self.result_store = ResultStore()
+        # Background mining run: its miner, thread and the queue it reports to
+        self.mining_spade = None
+        self.mining_thread = None
+        self.mining_events = None
+        # Orders saved while a run is in progress, folded in when it ends
+        self.pending_rows = []
         
         # Thiết lập icon cho phần cửa sổ (nếu có)
         # try:
@@ -135,6 +162,11 @@ class SPADEApp(tk.Tk):
         
         self.status_var = tk.StringVar(value="Ready")
         ttk.Label(status_frame, textvariable=self.status_var, anchor=tk.W, padding=(10, 5)).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", command=self.cancel_spade, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT, padx=(5, 10), pady=5)
+        self.progress_bar = ttk.Progressbar(status_frame, mode="determinate", length=200, maximum=1.0)
+        self.progress_bar.pack(side=tk.RIGHT, pady=5)
     
     def load_standard_products(self):
         """Load standard products from data.csv"""
@@ -420,13 +452,90 @@ class SPADEApp(tk.Tk):
             
             # Save DataFrame to CSV file
             df.to_csv(csv_path, index=False)
-            
-            messagebox.showinfo("Success", "Data saved successfully!")
-            
-            # Clear form and generate next invoice number
-            self.clear_form()
         except Exception as e:
             messagebox.showerror("Error", f"Could not save data: {str(e)}")
+            return
+        
+        # The order is in the CSV now: a failure below must not keep the form filled in
+        try:
+            # The order only belongs to the loaded data if it was loaded from this CSV
+            if self.loaded_path is not None and os.path.abspath(self.loaded_path) == os.path.abspath(csv_path):
+                self.add_order(pd.DataFrame([new_data]))
+            messagebox.showinfo("Success", "Data saved successfully!")
+        except Exception as e:
+            messagebox.showerror("Error", f"Data saved to {csv_path}, but could not be added to the loaded data: "
+                                          f"{str(e)}\nLoad and clean the file again to include it.")
+        
+        # Clear form and generate next invoice number
+        self.clear_form()
+
+    def add_order(self, row):
+        """
+        Append a saved order (a row of form text) to the loaded and cleaned
+        data, and fold it into the mined sequences
+        """
+        # Blank fields are missing values, as in a CSV
+        row = row.mask(row == '')
+        self.data = concat_chunks([self.data, self.typed_like(self.data, row)])
+        if self.cleaned_data is None:
+            return
+        # Coerced and checked like any loaded row before taking the cleaned types
+        order = clean_data(row)
+        if order.empty:
+            return
+        order = self.typed_like(self.cleaned_data, order)
+        self.catalog.add_transactions(order)
+        self.cleaned_data = concat_chunks([self.cleaned_data, order])
+        # The CSV changed: its saved set is replaced, with the order
+        self.transaction_store.save(self.loaded_path, self.cleaned_data)
+        
+        # Fold the new order into the mined sequences instead of re-mining;
+        # if a run is in progress, its miner takes the order when it ends
+        self.pending_rows.append(order)
+        if self.mining_spade is None:
+            self.update_spade()
+
+    @staticmethod
+    def typed_like(frame, row):
+        """
+        row with the columns of frame, and their types. Values that do not
+        convert become missing (an integer column then stays float).
+        """
+        row = row.reindex(columns=frame.columns)
+        for column in frame.columns:
+            dtype = frame[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                row[column] = row[column].astype(dtype.categories.dtype).astype('category')
+            elif dtype.kind == 'M':
+                row[column] = pd.to_datetime(row[column], errors='coerce')
+            elif dtype.kind in 'iuf':
+                values = pd.to_numeric(row[column], errors='coerce')
+                row[column] = values.astype(dtype) if values.notna().all() else values
+            else:
+                row[column] = row[column].astype(dtype)
+        return row
+
+    def update_spade(self):
+        """
+        Fold the pending orders into self.spade on the mining thread; False
+        if there is nothing to update. A miner is only made incremental once
+        an order is saved (tracking every candidate count slows mining down):
+        the first time, the cleaned data, which already holds the orders, is
+        mined again in incremental mode.
+        """
+        rows, self.pending_rows = self.pending_rows, []
+        if not rows or self.spade is None:
+            return False
+        rows = pd.concat(rows, ignore_index=True)
+        if self.spade.incremental:
+            spade = self.spade
+            self.start_mining(spade, lambda: spade.update(rows), "Adding the saved orders...")
+        else:
+            spade = SPADEAlgorithm(min_support=self.spade.min_support, incremental=True,
+                                   result_store=self.result_store, progress=self.queue_progress)
+            data = self.cleaned_data
+            self.start_mining(spade, lambda: self.mine(spade, data), "Mining again with the saved orders...")
+        return True
 
     def clear_form(self):
         """Clear data in the form and reset to defaults"""
@@ -479,13 +588,24 @@ class SPADEApp(tk.Tk):
             self.status_var.set("Loading data...")
             self.update_idletasks()
             
-            # Load data
-            self.data = pd.read_csv(file_path)
+            # A CSV cleaned in an earlier session is read from its saved transaction set
+            self.data = self.transaction_store.load(file_path)
+            if self.data is None and is_transaction_set(file_path):
+                self.data = load_transactions(file_path)
+            self.data_source = file_path if self.data is None else None
+            self.loaded_path = file_path
+            if self.data is None:
+                # Load data: chunks typed with CSV_DTYPES (categorical codes and names), joined once
+                with read_chunks(file_path) as reader:
+                    self.data = concat_chunks(reader)
             
             # Display data in the data tab
             self.display_data(self.data)
             
-            self.status_var.set(f"Loaded {len(self.data)} rows successfully.")
+            if self.data_source is None:
+                self.status_var.set(f"Loaded {len(self.data)} cleaned rows from the saved transaction set.")
+            else:
+                self.status_var.set(f"Loaded {len(self.data)} rows successfully.")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load data: {str(e)}")
@@ -563,29 +683,14 @@ class SPADEApp(tk.Tk):
             self.status_var.set("Cleaning data...")
             self.update_idletasks()
             
-            # Make a copy of the data
-            df = self.data.copy()
+            # Drop incomplete, cancelled and non-positive rows, convert types
+            df = clean_data(self.data)
             
-            # 1. Handle missing values
-            df = df.dropna(subset=['CustomerID', 'StockCode', 'InvoiceNo'])
-            
-            # 2. Convert data types
-            df['CustomerID'] = df['CustomerID'].astype(int)
-            
-            # 3. Convert InvoiceDate to datetime
-            df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
-            
-            # 4. Remove cancelled invoices (those starting with 'C')
-            df = df[~df['InvoiceNo'].astype(str).str.startswith('C')]
-            
-            # 5. Remove rows with negative or zero quantities
-            df = df[df['Quantity'] > 0]
-            
-            # 6. Remove rows with negative or zero prices
-            df = df[df['UnitPrice'] > 0]
-            
-            # Store cleaned data
+            # Store cleaned data, and save it for the next time this CSV is loaded
             self.cleaned_data = df
+            if self.data_source is not None:
+                self.transaction_store.save(self.data_source, df)
+            self.catalog = ProductCatalog.from_transactions(df)
             
             # Display cleaned data
             self.display_data(self.cleaned_data)
@@ -612,11 +717,11 @@ class SPADEApp(tk.Tk):
         if self.cleaned_data is None:
             messagebox.showerror("Error", "Please clean the data first.")
             return
+        if self.mining_thread is not None and self.mining_thread.is_alive():
+            messagebox.showinfo("Info", "SPADE is already running.")
+            return
         
         try:
-            self.status_var.set("Running SPADE algorithm...")
-            self.update_idletasks()
-            
             # Get minimum support parameter
             min_support = self.min_support.get()
             if min_support <= 0 or min_support > 1:
@@ -624,70 +729,134 @@ class SPADEApp(tk.Tk):
                 return
             
             # Initialize SPADE algorithm
-            self.spade = SPADEAlgorithm(min_support=min_support)
-            
-            # Preprocess data
-            self.spade.preprocess_data(self.cleaned_data)
-            
-            # Find frequent sequences
-            frequent_sequences = self.spade.find_frequent_sequences()
-            
-            # Display results
-            self.display_frequent_sequences(frequent_sequences)
-            
-            # Generate recommendations
-            self.generate_recommendations()
-            
-            self.status_var.set(f"Found {len(frequent_sequences)} frequent sequences.")
-            
+            spade = SPADEAlgorithm(min_support=min_support, result_store=self.result_store,
+                                   progress=self.queue_progress)
         except Exception as e:
             messagebox.showerror("Error", f"Error running SPADE: {str(e)}")
-            self.status_var.set("Error running SPADE algorithm.")
+            return
+        
+        data = self.cleaned_data
+        self.start_mining(spade, lambda: self.mine(spade, data), "Building sequence database...")
     
-    def display_frequent_sequences(self, sequences):
-        # Clear results tab
-        for widget in self.results_tab.winfo_children():
-            widget.destroy()
+    def start_mining(self, spade, work, status):
+        """
+        Run work() (mining or updating spade) on a worker thread. It reports
+        progress to a queue that the Tk loop polls, widgets are only touched
+        from this thread.
+        """
+        self.mining_events = queue.Queue()
+        self.mining_spade = spade
+        self.status_var.set(status)
+        self.progress_bar.configure(mode="indeterminate")
+        self.progress_bar.start(15)
+        self.cancel_button.configure(state=tk.NORMAL)
+        self.mining_thread = threading.Thread(
+            target=self.mine_in_background, args=(work, self.mining_events), daemon=True)
+        self.mining_thread.start()
+        self.after(100, self.poll_mining)
+    
+    def queue_progress(self, info):
+        """Progress callback of the miners, called on the mining thread"""
+        self.mining_events.put(('progress', info))
+    
+    def mine(self, spade, data):
+        # Preprocess data (cached by content of the cleaned data)
+        spade.preprocess_data(data, cache=self.sequence_cache)
+        return spade.find_frequent_sequences()
+    
+    def mine_in_background(self, work, events):
+        """Worker thread: mine, then hand the result to the Tk loop"""
+        try:
+            frequent_sequences = work()
+            events.put(('done', (frequent_sequences, NextItemIndex(frequent_sequences))))
+        except MiningCancelled:
+            events.put(('cancelled', None))
+        except Exception as e:
+            events.put(('error', e))
+    
+    def poll_mining(self):
+        """Apply the events of the mining thread; reschedules itself until the run ends"""
+        finished = None
+        try:
+            while finished is None:
+                kind, payload = self.mining_events.get_nowait()
+                if kind == 'progress':
+                    self.show_mining_progress(payload)
+                else:
+                    finished = kind, payload
+        except queue.Empty:
+            pass
+        if finished is None:
+            self.after(100, self.poll_mining)
+            return
         
-        # Create frame
-        frame = ttk.Frame(self.results_tab)
-        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode="determinate", value=0)
+        self.cancel_button.configure(state=tk.DISABLED)
+        kind, payload = finished
+        spade, self.mining_spade = self.mining_spade, None
+        try:
+            if kind == 'done':
+                self.finish_spade(spade, *payload)
+            else:
+                if spade is self.spade:
+                    # An update stopped halfway: its miner is left in a partial state
+                    self.spade = None
+                # Otherwise the previous miner stays, and takes the orders saved during the run
+                updating = self.update_spade()
+                if kind == 'error':
+                    raise payload
+                if not updating:
+                    self.status_var.set("SPADE run cancelled.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Error running SPADE: {str(e)}")
+            if self.mining_spade is None:
+                self.status_var.set("Error running SPADE algorithm.")
+    
+    def show_mining_progress(self, info):
+        if info.stage == 'database':
+            self.status_var.set("Finding frequent items...")
+            return
+        if info.stage == 'items':
+            self.status_var.set(f"Found {info.patterns:,} frequent items, mining sequences...")
+            return
+        if str(self.progress_bar.cget("mode")) != "determinate":
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+        self.progress_bar.configure(value=info.fraction)
+        self.status_var.set(f"Mining length-{info.level} patterns: class {info.classes_done}/{info.classes_total}, "
+                            f"{info.candidates:,} candidates, {info.patterns:,} patterns found")
+    
+    def cancel_spade(self):
+        if self.mining_spade is not None:
+            self.mining_spade.cancel()
+            self.cancel_button.configure(state=tk.DISABLED)
+            self.status_var.set("Cancelling...")
+    
+    def finish_spade(self, spade, frequent_sequences, recommendation_index):
+        self.spade = spade
+        self.recommendation_index = recommendation_index
         
-        # Create treeview
-        tree = ttk.Treeview(frame, columns=["Sequence", "Support", "Items"], show="headings")
+        # Display results
+        self.display_frequent_sequences(frequent_sequences)
         
-        # Add scrollbars
-        vsb = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-        hsb = ttk.Scrollbar(frame, orient="horizontal", command=tree.xview)
-        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        # Generate recommendations
+        self.generate_recommendations()
         
-        # Pack scrollbars and treeview
-        vsb.pack(side=tk.RIGHT, fill=tk.Y)
-        hsb.pack(side=tk.BOTTOM, fill=tk.X)
-        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.status_var.set(f"Found {len(frequent_sequences)} frequent sequences.")
         
-        # Configure columns
-        tree.heading("Sequence", text="Sequence")
-        tree.column("Sequence", width=100)
-        tree.heading("Support", text="Support")
-        tree.column("Support", width=100)
-        tree.heading("Items", text="Items")
-        tree.column("Items", width=400)
-        
-        # Insert data
-        for i, (sequence, support) in enumerate(sequences):
-            # Lookup product descriptions if available
-            if 'Description' in self.cleaned_data.columns:
-                items_desc = []
-                for item in sequence:
-                    desc = self.cleaned_data[self.cleaned_data['StockCode'] == item]['Description'].iloc[0] \
-                        if len(self.cleaned_data[self.cleaned_data['StockCode'] == item]) > 0 else "Unknown"
-                    items_desc.append(f"{item}: {desc}")
-                items_str = " -> ".join(items_desc)
-            else:
-                items_str = " -> ".join(sequence)
-            
-            tree.insert("", tk.END, values=[str(sequence), f"{support:.4f}", items_str])
+        # Orders saved during the run
+        self.update_spade()
+    
+    def display_frequent_sequences(self, sequences):
+        # Clear results tab
+        for widget in self.results_tab.winfo_children():
+            widget.destroy()
+        
+        # Virtualized table: only the visible rows are formatted and inserted,
+        # sorting and filtering by support, length and item happen on arrays
+        self.pattern_table = PatternTable(self.results_tab, sequences, self.catalog if len(self.catalog) else None)
+        self.pattern_table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
     def generate_statistics(self):
         if self.cleaned_data is None:
@@ -702,7 +871,7 @@ class SPADEApp(tk.Tk):
             self.display_statistics()
             
             # Generate visualizations
-            create_visualizations(self.cleaned_data, self.viz_tab)
+            create_visualizations(self.cleaned_data, self.viz_tab, self.catalog)
             
             self.status_var.set("Statistics and visualizations generated.")
             
@@ -791,8 +960,7 @@ class SPADEApp(tk.Tk):
         
         # Insert top products
         for i, (product, count) in enumerate(product_counts.head(10).items(), 1):
-            desc = self.cleaned_data[self.cleaned_data['StockCode'] == product]['Description'].iloc[0] \
-                if 'Description' in self.cleaned_data.columns and len(self.cleaned_data[self.cleaned_data['StockCode'] == product]) > 0 else "Unknown"
+            desc = self.catalog.description(product)
             tree.insert("", tk.END, values=[i, product, desc, f"{count:,}"], tags=('even' if i % 2 == 0 else 'odd',))
         
         # Configure row tags for alternating colors
@@ -849,25 +1017,8 @@ class SPADEApp(tk.Tk):
         for widget in self.rec_results_frame.winfo_children():
             widget.destroy()
         
-        # Find sequences containing the selected product
-        recommendations = {}
-        
-        for seq, support in self.spade.frequent_sequences:
-            if product in seq:
-                # Find position of product in sequence
-                pos = seq.index(product)
-                
-                # Get products that appear after the selected product
-                for i in range(pos + 1, len(seq)):
-                    next_item = seq[i]
-                    if next_item != product:  # Don't recommend the same product
-                        if next_item in recommendations:
-                            recommendations[next_item] = max(recommendations[next_item], support)
-                        else:
-                            recommendations[next_item] = support
-        
-        # Sort recommendations by support
-        sorted_recs = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
+        # Products that follow the selected product in frequent sequences, by confidence
+        sorted_recs = self.recommendation_index.recommend(product, 20)
         
         if not sorted_recs:
             # Hiển thị thông báo không có đề xuất với kiểu đẹp hơn
@@ -880,12 +1031,7 @@ class SPADEApp(tk.Tk):
             return
         
         # Get product description
-        if 'Description' in self.cleaned_data.columns:
-            prod_desc = self.cleaned_data[self.cleaned_data['StockCode'] == product]['Description'].iloc[0] \
-                if len(self.cleaned_data[self.cleaned_data['StockCode'] == product]) > 0 else "Unknown"
-            product_info = f"{product} ({prod_desc})"
-        else:
-            product_info = product
+        product_info = f"{product} ({self.catalog.description(product)})" if len(self.catalog) else product
         
         # Tạo header có thiết kế đẹp hơn
         header_frame = ttk.Frame(self.rec_results_frame)
@@ -899,7 +1045,7 @@ class SPADEApp(tk.Tk):
         results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Create treeview với thiết kế hiện đại hơn
-        tree = ttk.Treeview(results_frame, columns=["Rank", "Product", "Description", "Confidence"], show="headings", height=15)
+        tree = ttk.Treeview(results_frame, columns=["Rank", "Product", "Description", "Support", "Confidence", "Lift"], show="headings", height=15)
         
         # Add scrollbars
         vsb = ttk.Scrollbar(results_frame, orient="vertical", command=tree.yview)
@@ -916,18 +1062,18 @@ class SPADEApp(tk.Tk):
         tree.column("Product", width=100)
         tree.heading("Description", text="Description")
         tree.column("Description", width=300)
+        tree.heading("Support", text="Support")
+        tree.column("Support", width=80, anchor=tk.CENTER)
         tree.heading("Confidence", text="Confidence")
         tree.column("Confidence", width=100, anchor=tk.CENTER)
+        tree.heading("Lift", text="Lift")
+        tree.column("Lift", width=80, anchor=tk.CENTER)
         
         # Insert recommendations with rank and alternating colors
-        for i, (product, confidence) in enumerate(sorted_recs[:20], 1):  # Show top 20 recommendations
-            if 'Description' in self.cleaned_data.columns:
-                desc = self.cleaned_data[self.cleaned_data['StockCode'] == product]['Description'].iloc[0] \
-                    if len(self.cleaned_data[self.cleaned_data['StockCode'] == product]) > 0 else "Unknown"
-            else:
-                desc = "N/A"
+        for i, (product, support, confidence, lift) in enumerate(sorted_recs[:20], 1):  # Show top 20 recommendations
+            desc = self.catalog.description(product) if len(self.catalog) else "N/A"
             
-            tree.insert("", tk.END, values=[i, product, desc, f"{confidence:.4f}"], tags=('even' if i % 2 == 0 else 'odd',))
+            tree.insert("", tk.END, values=[i, product, desc, f"{support:.4f}", f"{confidence:.4f}", f"{lift:.2f}"], tags=('even' if i % 2 == 0 else 'odd',))
         
         # Configure row tags for alternating colors
         tree.tag_configure('even', background='#f5f5f5')
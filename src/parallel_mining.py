@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+# State of a worker process, set once by _init_worker
+_worker = {}
+
+
+def _write_members(members, directory):
+    """
+    Write the id-lists of the root class into memory-mappable .npy files, one
+    file per field, concatenated over members. Returns the per-member offsets.
+    """
+    vertical_type = type(members[0][2])
+    sizes = [len(getattr(id_list, vertical_type.fields[0])) for _, _, id_list in members]
+    offsets = np.concatenate(([0], np.cumsum(sizes))).tolist()
+    for field in vertical_type.fields:
+        np.save(os.path.join(directory, f"{field}.npy"),
+                np.concatenate([getattr(id_list, field) for _, _, id_list in members]))
+    return vertical_type, offsets
+
+
+def _init_worker(directory, vertical_type, offsets, member_keys, options, sequence_count, items, stop):
+    """Map the shared id-lists and build the worker's miner; stop is set to cancel the run"""
+    from spade_algorithm import SequenceDatabase, SPADEAlgorithm
+    
+    arrays = [np.load(os.path.join(directory, f"{field}.npy"), mmap_mode='r')
+              for field in vertical_type.fields]
+    _worker['members'] = [
+        (item_id, step, vertical_type(*[array[offsets[k]:offsets[k + 1]] for array in arrays]))
+        for k, (item_id, step) in enumerate(member_keys)
+    ]
+    
+    spade = SPADEAlgorithm(**options)
+    spade.sequence_count = sequence_count
+    empty = np.empty(0, dtype=np.int32)
+    spade.database = SequenceDatabase(np.empty(0), items, empty, empty, empty)
+    # Constrained joins extend with single items, the members of the root class
+    spade.vertical_db = {item_id: id_list for item_id, _, id_list in _worker['members']}
+    spade.frequent_item_ids = sorted(spade.vertical_db)
+    # Shared with the parent: cancel() there reaches the running classes
+    spade._cancel = stop
+    _worker['spade'] = spade
+
+
+def _mine_root_member(index):
+    """
+    Mine the class rooted at one frequent item; returns its frequent
+    sequences, stats and candidate counts (incremental mode only)
+    """
+    spade = _worker['spade']
+    spade.frequent_sequences = []
+    spade.candidate_counts = {}
+    spade.top_patterns = []
+    spade.top_k_count = 0
+    spade.top_k_order = 0
+    spade.stats = dict.fromkeys(spade.stats, 0)
+    spade.mine_member_depth_first((), _worker['members'], index)
+    if spade.top_k is not None:
+        spade.frequent_sequences = spade.top_k_sequences()
+    return spade.frequent_sequences, spade.stats, spade.candidate_counts
+
+
+def mine_in_parallel(spade, members, n_jobs):
+    """
+    Mine the classes rooted at each member of the root class in n_jobs
+    processes. Id-lists reach the workers as memory-mapped arrays, only the
+    patterns found travel back. Results are returned in the same order as a
+    serial depth-first run.
+    """
+    from spade_algorithm import MiningCancelled
+    
+    with tempfile.TemporaryDirectory(prefix="spade-") as directory:
+        vertical_type, offsets = _write_members(members, directory)
+        stop = multiprocessing.Event()
+        initargs = (directory, vertical_type, offsets, [member[:2] for member in members],
+                    spade.mining_options(), spade.sequence_count, spade.database.items, stop)
+        
+        # Submit the largest classes first so that the pool stays busy
+        order = sorted(range(len(members)), key=lambda k: -members[k][2].support_count())
+        with ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=initargs) as pool:
+            futures = {k: pool.submit(_mine_root_member, k) for k in order}
+            spade.classes_total = len(members)
+            pending = set(futures.values())
+            found = len(spade.frequent_sequences)
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=spade.PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        sequences, stats, _ = future.result()
+                        found += len(sequences)
+                        for key, value in stats.items():
+                            spade.stats[key] += value
+                    spade.classes_done = len(members) - len(pending)
+                    spade.report_progress(patterns=found)
+            except MiningCancelled:
+                # Running classes stop at their next check, the others never start
+                stop.set()
+                for future in pending:
+                    future.cancel()
+                raise
+            
+            results = []
+            for k in range(len(members)):
+                sequences, _, candidate_counts = futures[k].result()
+                results.extend(sequences)
+                spade.candidate_counts.update(candidate_counts)
+    
+    return results
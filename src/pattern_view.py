@@ -0,0 +1,279 @@
+"""
+Virtualized view of the frequent sequences for the results tab.
+
+PatternList keeps the patterns with numpy arrays of their supports and
+lengths; filtering and sorting only rearrange an array of pattern indices
+and rows are formatted when they are shown. PatternTable is a ttk.Treeview
+with one item per visible row: scrolling rewrites the values of those rows,
+so drawing costs the same for 100 or 1,000,000 patterns.
+"""
+import tkinter as tk
+from itertools import chain
+from tkinter import ttk
+
+import numpy as np
+import pandas as pd
+
+
+class PatternList:
+    """Filtered, sorted view over frequent_sequences"""
+    SORT_COLUMNS = ('Sequence', 'Support', 'Length')
+
+    def __init__(self, sequences, descriptions=None):
+        """descriptions: StockCode -> Description, None to show codes only"""
+        self.sequences = sequences
+        self.descriptions = descriptions
+        n = len(sequences)
+        self.supports = np.fromiter((support for _, support in sequences), dtype=np.float64, count=n)
+        self.lengths = np.fromiter((sum(map(len, sequence)) for sequence, _ in sequences), dtype=np.int32, count=n)
+        self.view = np.arange(n)
+        self.sort_column = None
+        self.sort_descending = False
+        # Built on first use: item codes of all pattern items with their pattern, and labels
+        self._item_codes = None
+        self._item_owners = None
+        self._item_index = None
+        self._labels = None
+
+    def __len__(self):
+        return len(self.view)
+
+    def filter(self, min_support=None, min_length=None, max_length=None, items=()):
+        """Keep patterns with these bounds that contain all of items; the current sort is kept"""
+        keep = np.ones(len(self.sequences), dtype=bool)
+        if min_support is not None:
+            keep &= self.supports >= min_support
+        if min_length is not None:
+            keep &= self.lengths >= min_length
+        if max_length is not None:
+            keep &= self.lengths <= max_length
+        for item in items:
+            keep &= self.containing(item)
+        self.view = np.flatnonzero(keep)
+        if self.sort_column is not None:
+            self.sort(self.sort_column, self.sort_descending)
+
+    def containing(self, item):
+        """Boolean mask of the patterns that contain item (compared as text, as typed in the filter)"""
+        if self._item_codes is None:
+            flat = chain.from_iterable(chain.from_iterable(sequence) for sequence, _ in self.sequences)
+            self._item_codes, uniques = pd.factorize(pd.Series(list(map(str, flat)), dtype=object))
+            self._item_index = pd.Index(uniques)
+            self._item_owners = np.repeat(np.arange(len(self.sequences)), self.lengths)
+        mask = np.zeros(len(self.sequences), dtype=bool)
+        code = self._item_index.get_indexer([str(item)])[0]
+        if code >= 0:
+            mask[self._item_owners[self._item_codes == code]] = True
+        return mask
+
+    def sort(self, column, descending=False):
+        """Stable sort of the view by 'Sequence', 'Support' or 'Length'"""
+        if column == 'Support':
+            keys = self.supports
+        elif column == 'Length':
+            keys = self.lengths
+        elif column == 'Sequence':
+            if self._labels is None:
+                self._labels = np.array([str(sequence) for sequence, _ in self.sequences], dtype=object)
+            keys = self._labels
+        else:
+            raise ValueError(f"Cannot sort by {column}")
+        keys = keys[self.view]
+        if descending:
+            # Reverse, stable sort, reverse back keeps ties in view order
+            order = np.argsort(keys[::-1], kind='stable')[::-1]
+            order = len(keys) - 1 - order
+        else:
+            order = np.argsort(keys, kind='stable')
+        self.view = self.view[order]
+        self.sort_column = column
+        self.sort_descending = descending
+
+    def row(self, index):
+        """Treeview values (sequence, support, length, items) of pattern index"""
+        sequence, support = self.sequences[index]
+        if self.descriptions is not None:
+            itemsets = [", ".join(f"{item}: {self.descriptions.get(item, 'Unknown')}" for item in itemset)
+                        for itemset in sequence]
+            items = " -> ".join(f"{{{desc}}}" if len(itemset) > 1 else desc
+                                for itemset, desc in zip(sequence, itemsets))
+        else:
+            items = " -> ".join(", ".join(map(str, itemset)) for itemset in sequence)
+        return str(sequence), f"{support:.4f}", int(self.lengths[index]), items
+
+    def rows(self, start, stop):
+        """Values of the rows start:stop of the view"""
+        return [self.row(index) for index in self.view[start:stop].tolist()]
+
+
+class PatternTable(ttk.Frame):
+    """Results table with filter controls; only the visible rows exist in the Treeview"""
+    COLUMNS = ('Sequence', 'Support', 'Length', 'Items')
+    WIDTHS = (160, 80, 60, 500)
+
+    def __init__(self, master, sequences, descriptions=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.patterns = PatternList(sequences, descriptions)
+        self.offset = 0             # view position of the first visible row
+        self.visible_rows = 20
+        self.selected = None        # pattern index of the selected row
+        self.create_controls()
+        self.create_table()
+        self.refresh()
+
+    def create_controls(self):
+        controls = ttk.Frame(self)
+        controls.pack(fill=tk.X, pady=(0, 8))
+
+        self.min_support_var = tk.StringVar()
+        self.min_length_var = tk.StringVar()
+        self.max_length_var = tk.StringVar()
+        self.items_var = tk.StringVar()
+        fields = [("Min support:", self.min_support_var, 8), ("Length from:", self.min_length_var, 4),
+                  ("to:", self.max_length_var, 4), ("Contains items:", self.items_var, 20)]
+        for label, variable, width in fields:
+            ttk.Label(controls, text=label).pack(side=tk.LEFT, padx=(0, 4))
+            entry = ttk.Entry(controls, textvariable=variable, width=width)
+            entry.pack(side=tk.LEFT, padx=(0, 10))
+            entry.bind("<Return>", lambda event: self.apply_filter())
+
+        ttk.Button(controls, text="Filter", command=self.apply_filter).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(controls, text="Reset", command=self.reset_filter).pack(side=tk.LEFT)
+        self.count_var = tk.StringVar()
+        ttk.Label(controls, textvariable=self.count_var, foreground="gray").pack(side=tk.RIGHT)
+
+    def create_table(self):
+        frame = ttk.Frame(self)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        self.tree = ttk.Treeview(frame, columns=self.COLUMNS, show="headings", selectmode="browse",
+                                 height=self.visible_rows)
+        self.vsb = ttk.Scrollbar(frame, orient="vertical", command=self.on_scrollbar)
+        hsb = ttk.Scrollbar(frame, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        hsb.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        for column, width in zip(self.COLUMNS, self.WIDTHS):
+            command = (lambda c=column: self.sort_by(c)) if column in PatternList.SORT_COLUMNS else ""
+            self.tree.heading(column, text=column, command=command)
+            self.tree.column(column, width=width, stretch=column == 'Items')
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        # Mouse wheel: Windows/macOS send <MouseWheel>, X11 buttons 4 and 5
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll_by(-1 if event.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(1, "units"))
+        self.tree.bind("<Up>", lambda event: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self.move_selection(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.move_selection(self.visible_rows))
+        self.tree.bind("<Home>", lambda event: self.scroll_to(0) or "break")
+        self.tree.bind("<End>", lambda event: self.scroll_to(len(self.patterns)) or "break")
+
+    def refresh(self):
+        """Show the rows offset:offset + visible_rows of the view"""
+        rows = self.patterns.rows(self.offset, self.offset + self.visible_rows)
+        children = self.tree.get_children()
+        for iid in children[len(rows):]:
+            self.tree.delete(iid)
+        for k, values in enumerate(rows):
+            if k < len(children):
+                self.tree.item(children[k], values=values)
+            else:
+                self.tree.insert("", tk.END, iid=f"row{k}", values=values)
+
+        # Keep the selection on the same pattern while it is visible
+        visible = self.patterns.view[self.offset:self.offset + len(rows)]
+        position = np.flatnonzero(visible == self.selected)
+        if self.selected is not None and len(position):
+            self.tree.selection_set(f"row{position[0]}")
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        total = len(self.patterns)
+        if total:
+            self.vsb.set(self.offset / total, min((self.offset + self.visible_rows) / total, 1.0))
+        else:
+            self.vsb.set(0.0, 1.0)
+        self.count_var.set(f"{total:,} of {len(self.patterns.sequences):,} patterns")
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), len(self.patterns) - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def scroll_by(self, count, what):
+        self.scroll_to(self.offset + count * (self.visible_rows if what == "pages" else 3))
+        return "break"
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * len(self.patterns))
+        elif action == "scroll":
+            self.scroll_by(int(args[0]), args[1])
+
+    def on_resize(self, event):
+        # Rows that fit below the heading; bbox is empty until a row is drawn
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        row_height = bbox[3] if bbox else 20
+        heading = bbox[1] if bbox else row_height
+        rows = max(1, (event.height - heading) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.offset = max(0, min(self.offset, len(self.patterns) - rows))
+            self.refresh()
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            position = self.offset + self.tree.index(selection[0])
+            if position < len(self.patterns):
+                self.selected = int(self.patterns.view[position])
+
+    def move_selection(self, step):
+        """Arrow and page keys: move the selection through the whole view, scrolling as needed"""
+        if not len(self.patterns):
+            return "break"
+        positions = np.flatnonzero(self.patterns.view == self.selected)
+        position = positions[0] + step if len(positions) else self.offset
+        position = max(0, min(int(position), len(self.patterns) - 1))
+        self.selected = int(self.patterns.view[position])
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + self.visible_rows:
+            self.offset = position - self.visible_rows + 1
+        self.refresh()
+        return "break"
+
+    def sort_by(self, column):
+        descending = not self.patterns.sort_descending if self.patterns.sort_column == column else column != 'Sequence'
+        self.patterns.sort(column, descending)
+        for name in PatternList.SORT_COLUMNS:
+            arrow = (" ▼" if descending else " ▲") if name == column else ""
+            self.tree.heading(name, text=name + arrow)
+        self.offset = 0
+        self.refresh()
+
+    def apply_filter(self):
+        try:
+            min_support = float(self.min_support_var.get()) if self.min_support_var.get().strip() else None
+            min_length = int(self.min_length_var.get()) if self.min_length_var.get().strip() else None
+            max_length = int(self.max_length_var.get()) if self.max_length_var.get().strip() else None
+        except ValueError:
+            self.count_var.set("Support must be a number, lengths integers")
+            return
+        items = self.items_var.get().replace(",", " ").split()
+        self.patterns.filter(min_support, min_length, max_length, items)
+        self.offset = 0
+        self.refresh()
+
+    def reset_filter(self):
+        for variable in (self.min_support_var, self.min_length_var, self.max_length_var, self.items_var):
+            variable.set("")
+        self.apply_filter()
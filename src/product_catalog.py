@@ -0,0 +1,72 @@
+"""
+StockCode -> Description lookup shared by the GUI, the charts and the
+recommendations.
+
+Built once per cleaned dataset: the first description of every StockCode in
+the transactions (what the old df[df['StockCode'] == code] scans returned),
+then the standard product list data/data.csv for codes the transactions do
+not describe. Lookups are dict gets instead of a scan of the whole frame.
+"""
+import os
+
+import pandas as pd
+
+PRODUCTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'data.csv')
+
+
+class ProductCatalog:
+    def __init__(self, descriptions=None):
+        self.descriptions = dict(descriptions or {})     # StockCode -> Description
+
+    @classmethod
+    def from_transactions(cls, df, products_path=PRODUCTS_PATH):
+        """Catalog of a cleaned transaction frame, completed from products_path (None to skip)"""
+        catalog = cls()
+        catalog.add_transactions(df)
+        if products_path is not None and os.path.exists(products_path):
+            catalog.add_transactions(pd.read_csv(products_path, usecols=['StockCode', 'Description']))
+        return catalog
+
+    def add_transactions(self, df):
+        """Describe the codes of df that have no description yet (first non-null one wins)"""
+        if 'Description' not in df.columns or df.empty:
+            return
+        first = df.groupby('StockCode', sort=False, observed=True)['Description'].first().dropna()
+        for code, description in zip(first.index.tolist(), first.tolist()):
+            self.descriptions.setdefault(code, description)
+
+    def __len__(self):
+        return len(self.descriptions)
+
+    def __contains__(self, code):
+        return self._key(code) is not None
+
+    def get(self, code, default=None):
+        """Description of code, or default; a code typed as text also finds a numeric StockCode"""
+        key = self._key(code)
+        return default if key is None else self.descriptions[key]
+
+    def description(self, code, default="Unknown"):
+        return self.get(code, default)
+
+    def label(self, code, width=None, separator=": "):
+        """'code: description', the description cut to width characters"""
+        description = self.get(code)
+        if description is None:
+            return str(code)
+        description = str(description)
+        if width is not None and len(description) > width:
+            description = description[:width - 2] + '...'
+        return f"{code}{separator}{description}"
+
+    def _key(self, code):
+        if code in self.descriptions:
+            return code
+        if isinstance(code, str):
+            try:
+                number = int(code)
+            except ValueError:
+                return None
+            return number if number in self.descriptions else None
+        text = str(code)
+        return text if text in self.descriptions else None
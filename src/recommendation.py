@@ -1,44 +1,394 @@
-from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from spade_algorithm import build_sequence_arrays
+
+def lookup_supports(keys, supports, queries):
+    """
+    Supports of the queries in a hash index of keys (one vectorized
+    pd.Index lookup for all of them), NaN where a query is not a key
+    """
+    rows = pd.Index(keys, tupleize_cols=False).get_indexer(pd.Index(queries, tupleize_cols=False, dtype=object))
+    values = np.asarray(supports, dtype=np.float64)[rows]
+    values[rows < 0] = np.nan
+    return values
 
 def generate_recommendations(frequent_itemsets, min_confidence=0.5):
-    """Generate recommendations from frequent itemsets"""
-    recommendations = []
+    """
+    The 10 most frequent itemsets (frozenset -> count) as (items, count).
+    An itemset of several items is kept if one of its rules X -> y reaches
+    min_confidence, with confidence = count(X + y) / count(X); single items
+    have no rule and are always kept.
+    """
+    itemsets = sorted(frequent_itemsets.items(), key=lambda x: x[1], reverse=True)
+    rules = [(row, itemset - {item}) for row, (itemset, _) in enumerate(itemsets) if len(itemset) > 1
+             for item in itemset]
+    keep = np.array([len(itemset) <= 1 for itemset, _ in itemsets], dtype=bool)
+    if rules:
+        rows = np.array([row for row, _ in rules])
+        antecedent = lookup_supports([itemset for itemset, _ in itemsets], [count for _, count in itemsets],
+                                     [antecedent for _, antecedent in rules])
+        # NaN (antecedent not in frequent_itemsets) fails the comparison too
+        confident = np.array([itemsets[row][1] for row in rows.tolist()]) / antecedent >= min_confidence
+        keep[rows[confident]] = True
+    return [(list(itemset), count) for (itemset, count), kept in zip(itemsets, keep) if kept][:10]
+
+def _mix(values):
+    """splitmix64 finalizer: spreads the bits of uint64 values"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+# Base of the polynomial pattern hashes in sequence_rules
+HASH_BASE = np.uint64(0x100000001B3)
+
+def _pattern_key(polynomial, length):
+    """64-bit key of a pattern from its polynomial hash and its number of itemsets"""
+    return _mix(polynomial + _mix(length.astype(np.uint64)))
+
+def sequence_rules(sequences, min_confidence=0.0):
+    """
+    Sequential rules X -> Y from frequent sequences: every pattern is split
+    between two of its itemsets into X (the itemsets before) and Y (the
+    itemsets after), with
+      confidence = sup(X -> Y) / sup(X)    lift = confidence / sup(Y)
+    
+    X and Y are subsequences of a frequent pattern, hence mined too, and
+    their supports are looked up in a hash index of the patterns. Patterns
+    are hashed as polynomials over their (mixed) itemset ids, mod 2**64, so
+    the keys of all prefixes and suffixes come from array operations, one
+    per itemset position: every rule is scored and filtered as a batch,
+    with no Python work per rule except for the rules returned. Rules with a
+    part missing from sequences (closed or maximal output, min_length > 1)
+    are dropped.
+    
+    Returns a DataFrame (antecedent, consequent, support, confidence, lift)
+    of the rules at or above min_confidence, by confidence then lift.
+    """
+    patterns = [seq for seq, _ in sequences]
+    supports = np.array([support for _, support in sequences], dtype=np.float64)
+    lengths = np.fromiter(map(len, patterns), dtype=np.int64, count=len(patterns))
+    # Dense ids of the distinct itemsets of all patterns, in pattern order
+    itemsets = pd.Index(list(map(tuple, chain.from_iterable(patterns))), tupleize_cols=False, dtype=object)
+    flat = itemsets.factorize()[0]
+    width = int(lengths.max()) if len(lengths) else 0
+    
+    # Itemset codes as a (pattern, position) matrix, then the hashes of all prefixes:
+    # prefix[r, j] = sum of codes[r, i] * HASH_BASE ** (j - 1 - i) for i < j
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    codes = np.zeros((len(lengths), width), dtype=np.uint64)
+    codes[owners, np.arange(len(flat)) - offsets[owners]] = _mix(flat.astype(np.uint64) + np.uint64(1))
+    prefix = np.zeros((len(lengths), width + 1), dtype=np.uint64)
+    for j in range(width):
+        prefix[:, j + 1] = prefix[:, j] * HASH_BASE + codes[:, j]
+    powers = np.array([pow(int(HASH_BASE), j, 1 << 64) for j in range(width + 1)], dtype=np.uint64)
+    
+    # Hash index of the patterns. A 64-bit collision between two patterns
+    # (odds about n**2 / 2**64) drops both rather than mixing them up.
+    rows = np.arange(len(lengths))
+    index = pd.Index(_pattern_key(prefix[rows, lengths], lengths))
+    pattern_supports = supports
+    if not index.is_unique:
+        unique = ~index.duplicated(keep=False)
+        index, pattern_supports = index[unique], supports[unique]
+    
+    def lookup(query):
+        found = index.get_indexer(query)
+        return np.where(found >= 0, pattern_supports[found], np.nan)
+    
+    # Rule (pattern r, split k): X is the first k itemsets, Y the last n - k
+    splits = np.maximum(lengths - 1, 0)
+    rows = np.repeat(rows, splits)
+    k = np.arange(len(rows)) - np.repeat(np.cumsum(splits) - splits, splits) + 1
+    n = lengths[rows]
+    antecedent_keys = _pattern_key(prefix[rows, k], k)
+    consequent_keys = _pattern_key(prefix[rows, n] - prefix[rows, k] * powers[n - k], n - k)
+    
+    support = supports[rows]
+    confidence = support / lookup(antecedent_keys)
+    lift = confidence / lookup(consequent_keys)
+    
+    # NaN (a missing part) fails the comparisons too
+    keep = np.flatnonzero((confidence >= min_confidence) & (lift >= 0))
+    keep = keep[np.lexsort((-lift[keep], -confidence[keep]))]
+    
+    # Slice the returned rules' patterns in pattern order (much faster than
+    # jumping around the pattern list), then put them in rank order
+    by_row = np.argsort(rows[keep], kind='stable')
+    kept = list(zip(rows[keep][by_row].tolist(), k[keep][by_row].tolist()))
+    antecedents = [patterns[row][:split] for row, split in kept]
+    consequents = [patterns[row][split:] for row, split in kept]
+    rank = np.empty_like(by_row)
+    rank[by_row] = np.arange(len(by_row))
+    rank = rank.tolist()
+    return pd.DataFrame({'antecedent': pd.Series([antecedents[i] for i in rank], dtype=object),
+                         'consequent': pd.Series([consequents[i] for i in rank], dtype=object),
+                         'support': support[keep], 'confidence': confidence[keep], 'lift': lift[keep]})
+
+def items_after(sequence, target_item):
+    """Items in the itemsets that follow the first itemset containing target_item"""
+    for pos, itemset in enumerate(sequence):
+        if target_item in itemset:
+            return [item for later in sequence[pos+1:] for item in later]
+    return []
+
+class ItemVocabulary:
+    """Dense ids of the items of the mined patterns, in order of first appearance"""
+    def __init__(self):
+        self.items = []         # item id -> item
+        self.item_ids = {}      # item -> item id
+    
+    def _item_id(self, item):
+        item_id = self.item_ids.get(item)
+        if item_id is None:
+            item_id = self.item_ids[item] = len(self.items)
+            self.items.append(item)
+        return item_id
+
+class NextItemIndex(ItemVocabulary):
+    """
+    Next-item lookup table, built once from the mined frequent sequences.
+    
+    For every item: the items that follow it in some frequent sequence
+    (in a later itemset), ranked by the best support of such a sequence as
+    in items_after. With all frequent sequences that best sequence is the
+    2-pattern <item, next item>, so
+      confidence = support / sup(item)    lift = confidence / sup(next item)
+    are those of the rule item -> next item. Since the support of the item
+    is the same for all its successors, ranking by support is ranking by
+    confidence. Stored in CSR form: the successors of item id k are
+    successors[offsets[k]:offsets[k + 1]], already ranked, so a top-k query
+    is a single slice.
+    """
+    def __init__(self, sequences):
+        super().__init__()
+        item_support = {}
+        best = {}               # (item id, next item id) -> best support, in order of discovery
+        
+        for seq, support in sequences:
+            if len(seq) == 1 and len(seq[0]) == 1:
+                item_id = self._item_id(seq[0][0])
+                item_support[item_id] = max(item_support.get(item_id, 0.0), support)
+            
+            # Items after the first itemset containing each item
+            seen = set()
+            for pos, itemset in enumerate(seq):
+                later = [self._item_id(item) for later_set in seq[pos+1:] for item in later_set]
+                for item in itemset:
+                    if item in seen:
+                        continue
+                    seen.add(item)
+                    item_id = self._item_id(item)
+                    for next_id in later:
+                        if next_id != item_id and best.get((item_id, next_id), -1.0) < support:
+                            best[(item_id, next_id)] = support
+        
+        pairs = np.array(list(best), dtype=np.int64).reshape(-1, 2)
+        supports = np.fromiter(best.values(), dtype=np.float64, count=len(best))
+        # By item, then support (descending), ties in order of discovery
+        order = np.lexsort((np.arange(len(best)), -supports, pairs[:, 0]))
+        self.successors = pairs[order, 1].astype(np.int32)
+        self.supports = supports[order]
+        self.offsets = np.searchsorted(pairs[order, 0], np.arange(len(self.items) + 1))
+        
+        # Rule scores of "item -> successor", NaN when a single-item support is
+        # unknown (e.g. closed output or min_length > 1 drop the single items)
+        self.item_supports = np.array([item_support.get(k, np.nan) for k in range(len(self.items))])
+        owners = np.repeat(np.arange(len(self.items)), np.diff(self.offsets))
+        self.confidences = self.supports / self.item_supports[owners]
+        self.lifts = self.confidences / self.item_supports[self.successors]
+        
+        ranked = sorted(item_support, key=lambda k: -item_support[k])
+        self.top_item_ids = np.array(ranked, dtype=np.int32)
+    
+    def recommend(self, item, k=20, min_confidence=0.0):
+        """
+        Top k (next item, support, confidence, lift) for one item. Entries
+        are ranked by confidence, so min_confidence cuts the slice short.
+        """
+        item_id = self.item_ids.get(item)
+        if item_id is None:
+            return []
+        start, end = self.offsets[item_id], self.offsets[item_id + 1]
+        end = min(start + k, end)
+        if min_confidence > 0:
+            end = start + int(np.count_nonzero(self.confidences[start:end] >= min_confidence))
+        return self._entries(np.arange(start, end))
+    
+    def recommend_many(self, items, k=20, min_confidence=0.0):
+        """recommend() for every item of a list"""
+        return [self.recommend(item, k, min_confidence) for item in items]
     
-    # Convert frozensets to lists for easier processing
-    itemsets = [(list(itemset), count) for itemset, count in frequent_itemsets.items()]
+    def recommend_basket(self, basket, k=20, min_confidence=0.0):
+        """
+        Top k (next item, support, confidence, lift) for a basket of items: the
+        best entry of any basket item, items of the basket and entries below
+        min_confidence excluded.
+        """
+        item_ids = [self.item_ids[item] for item in set(basket) if item in self.item_ids]
+        if not item_ids:
+            return []
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in item_ids])
+        rows = rows[~np.isin(self.successors[rows], item_ids)]
+        if min_confidence > 0:
+            rows = rows[self.confidences[rows] >= min_confidence]
+        
+        # Best row per successor, then rank by support
+        rows = rows[np.lexsort((-self.supports[rows], self.successors[rows]))]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = self.successors[rows[1:]] != self.successors[rows[:-1]]
+        rows = rows[first]
+        rows = rows[np.lexsort((rows, -self.supports[rows]))[:k]]
+        return self._entries(rows)
+    
+    def recommend_baskets(self, baskets, k=20, min_confidence=0.0):
+        """recommend_basket() for every basket of a list"""
+        return [self.recommend_basket(basket, k, min_confidence) for basket in baskets]
     
-    # Sort by count (descending)
-    itemsets.sort(key=lambda x: x[1], reverse=True)
+    def _entries(self, rows):
+        return list(zip([self.items[next_id] for next_id in self.successors[rows].tolist()],
+                        self.supports[rows].tolist(), self.confidences[rows].tolist(),
+                        self.lifts[rows].tolist()))
     
-    # Return top 10 itemsets as recommendations
-    return itemsets[:10]
+    def top_items(self, k=20):
+        """Most frequent single items as (item, support)"""
+        return [(self.items[item_id], float(self.item_supports[item_id]))
+                for item_id in self.top_item_ids[:k].tolist()]
+
 
-def generate_recommendations_from_sequences(sequences, target_item=None):
-    """Generate product recommendations based on a target item"""
-    recommendations = defaultdict(float)
+def generate_recommendations_from_sequences(sequences, target_item=None, index=None):
+    """
+    Generate product recommendations based on a target item.
+    Sequences are lists of itemsets, as returned by SPADEAlgorithm. Pass a
+    NextItemIndex built from them to avoid scanning the sequences again.
+    """
+    if index is None:
+        index = NextItemIndex(sequences)
     
     if target_item is None:
         # If no target item, return the top 20 items from frequent sequences
+        return index.top_items(20)
+    
+    # Items that appear after the target item, by support (descending)
+    return [(next_item, support) for next_item, support, *_ in index.recommend(target_item, 20)]
+
+class PatternTrie(ItemVocabulary):
+    """
+    Prefix trie over the itemsets of the mined patterns, to recommend the
+    next items for a customer's whole purchase history.
+    
+    Node 0 is the empty pattern; the child of node v by itemset I spells the
+    pattern of v followed by I. Every pattern X + (Y) with a non-empty X is
+    a rule "X -> each item of Y", stored on the node of X with
+      confidence = sup(X + (Y)) / sup(X)    lift = confidence / sup(item)
+    in CSR form (rules of node v: rule arrays [offsets[v]:offsets[v + 1]]).
+    Rules whose X was not mined (closed/maximal output) are left out.
+    
+    A history is matched by walking the trie along it, so the cost grows with
+    the history and the prefixes it matches, not with the number of patterns.
+    """
+    def __init__(self, sequences):
+        super().__init__()
+        self.children = [{}]    # node -> first item of an itemset -> [(set of its items, child node)]
+        nodes = {}              # (node, itemset) -> child node
+        node_supports = [np.nan]
+        item_support = {}
+        
+        # Insert every pattern, remembering the node of its prefix without the last itemset
+        rules = []
         for seq, support in sequences:
-            if len(seq) == 1:
-                recommendations[seq[0]] = max(recommendations[seq[0]], support)
-        
-        # Sort by support (descending)
-        sorted_recs = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
-        return sorted_recs[:20]
-    
-    # If target item is specified, find sequences containing the target item
-    for seq, support in sequences:
-        if target_item in seq:
-            # Find position of target item in sequence
-            pos = seq.index(target_item)
-            
-            # Get items that appear after the target item
-            for i in range(pos+1, len(seq)):
-                next_item = seq[i]
-                if next_item != target_item:  # Don't recommend the same item
-                    recommendations[next_item] = max(recommendations[next_item], support)
-    
-    # Sort by support (descending)
-    sorted_recs = sorted(recommendations.items(), key=lambda x: x[1], reverse=True)
-    return sorted_recs[:20]  # Return top 20 recommendations
\ No newline at end of file
+            node = 0
+            for pos, itemset in enumerate(seq):
+                if pos == len(seq) - 1 and node != 0:
+                    rules.append((node, itemset, support))
+                key = (node, tuple(itemset))
+                child = nodes.get(key)
+                if child is None:
+                    child = nodes[key] = len(self.children)
+                    self.children.append({})
+                    node_supports.append(np.nan)
+                    self.children[node].setdefault(itemset[0], []).append((set(itemset), child))
+                node = child
+            node_supports[node] = support
+            if len(seq) == 1 and len(seq[0]) == 1:
+                item_support[self._item_id(seq[0][0])] = support
+        
+        rule_nodes = np.array([node for node, itemset, _ in rules for _ in itemset], dtype=np.int64)
+        rule_items = np.array([self._item_id(item) for _, itemset, _ in rules for item in itemset], dtype=np.int64)
+        supports = np.array([support for _, itemset, support in rules for _ in itemset], dtype=np.float64)
+        confidences = supports / np.asarray(node_supports, dtype=np.float64)[rule_nodes]
+        item_supports = np.array([item_support.get(k, np.nan) for k in range(len(self.items))])
+        lifts = confidences / item_supports[rule_items]
+        
+        # By node, then confidence (descending); rules without a confidence are dropped
+        known = np.flatnonzero(~np.isnan(confidences))
+        order = known[np.lexsort((-confidences[known], rule_nodes[known]))]
+        self.rule_items = rule_items[order]
+        self.supports = supports[order]
+        self.confidences = confidences[order]
+        self.lifts = lifts[order]
+        self.offsets = np.searchsorted(rule_nodes[order], np.arange(len(self.children) + 1))
+    
+    def match(self, history):
+        """
+        Nodes of all patterns contained in history (a list of itemsets, oldest
+        first), found by extending the matched prefixes with every itemset
+        """
+        matched = {0}
+        for itemset in history:
+            basket = set(itemset)
+            extended = []
+            for node in matched:
+                children = self.children[node]
+                for item in basket:
+                    for members, child in children.get(item, ()):
+                        if members <= basket:
+                            extended.append(child)
+            matched.update(extended)
+        matched.discard(0)
+        return matched
+    
+    def recommend(self, history, k=20, min_confidence=0.0):
+        """
+        Top k (next item, support, confidence, lift) after a purchase history:
+        the best rule of every matched prefix, per item, by confidence
+        """
+        nodes = [node for node in self.match(history) if self.offsets[node] < self.offsets[node + 1]]
+        if not nodes:
+            return []
+        rows = np.concatenate([np.arange(self.offsets[node], self.offsets[node + 1]) for node in nodes])
+        rows = rows[self.confidences[rows] >= min_confidence]
+        
+        # Best rule per item, then rank by confidence and support
+        rows = rows[np.lexsort((-self.supports[rows], -self.confidences[rows], self.rule_items[rows]))]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = self.rule_items[rows[1:]] != self.rule_items[rows[:-1]]
+        rows = rows[first]
+        rows = rows[np.lexsort((-self.supports[rows], -self.confidences[rows]))[:k]]
+        return list(zip([self.items[item_id] for item_id in self.rule_items[rows].tolist()],
+                        self.supports[rows].tolist(), self.confidences[rows].tolist(),
+                        self.lifts[rows].tolist()))
+    
+    def recommend_batch(self, histories, k=20, min_confidence=0.0):
+        """recommend() for many histories: a list, or a dict customer -> history"""
+        if isinstance(histories, dict):
+            return {customer: self.recommend(history, k, min_confidence)
+                    for customer, history in histories.items()}
+        return [self.recommend(history, k, min_confidence) for history in histories]
+
+
+def customer_histories(df, recent=None):
+    """
+    CustomerID -> list of itemsets (oldest first) from transaction rows,
+    built like the SPADE sequence database. recent keeps only the last
+    invoices of every customer.
+    """
+    histories = build_sequence_arrays(df).to_sequences()
+    if recent is None:
+        return dict(histories)
+    return {customer: itemsets[-recent:] for customer, itemsets in histories}
@@ -0,0 +1,290 @@
+"""
+HTTP service for next-item recommendations ("bought X, next bought Y").
+
+    python src/cli.py mine data.csv --min-support 0.01 --out patterns.jsonl
+    python src/recommendation_server.py patterns.jsonl --port 8000
+
+Loads a pattern file written by `cli.py mine` into a NextItemIndex and
+serves it with asyncio streams (stdlib only, HTTP/1.1 keep-alive):
+
+    GET  /recommend?item=X[&k=20&min_confidence=0]
+    POST /recommend   {"items": [...]} or {"baskets": [[...], ...]}, optional k, min_confidence
+    GET  /health
+    POST /reload      re-read the pattern file (SIGHUP does the same)
+
+A reload builds the new index in a worker thread while requests are still
+answered from the old one, then replaces it with a single assignment, so
+no request is dropped or sees a half-built index.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import read_patterns
+from recommendation import NextItemIndex
+
+MAX_BODY = 1 << 20
+# Encoded GET responses kept per loaded index
+RESPONSE_CACHE_SIZE = 4096
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServedIndex:
+    """One loaded pattern set with its response cache; replaced as a whole on reload"""
+    def __init__(self, index, source, version, pattern_count):
+        self.index = index
+        self.source = source
+        self.version = version
+        self.pattern_count = pattern_count
+        self.loaded_at = time.time()
+        self.responses = {}     # (item, k, min_confidence) -> encoded body
+
+    def info(self):
+        return {'version': self.version, 'source': self.source, 'patterns': self.pattern_count,
+                'items': len(self.index.items), 'loaded_at': self.loaded_at}
+
+
+def load_index(path, version):
+    """ServedIndex from a pattern file; items become strings, as they arrive in queries"""
+    sequences = [([[str(item) for item in itemset] for itemset in sequence], support)
+                 for sequence, support in read_patterns(path)]
+    return ServedIndex(NextItemIndex(sequences), path, version, len(sequences))
+
+
+def _entries(recommendations):
+    # Confidence and lift are NaN when the single-item supports were not mined
+    return [{'item': item, 'support': support,
+             'confidence': None if math.isnan(confidence) else confidence,
+             'lift': None if math.isnan(lift) else lift}
+            for item, support, confidence, lift in recommendations]
+
+
+def _encode(payload):
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+class RecommendationServer:
+    def __init__(self, path, host='127.0.0.1', port=8000, default_k=20):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.default_k = default_k
+        self.served = None
+        self.server = None
+        self._version = 0
+        self._reload_lock = asyncio.Lock()
+
+    async def reload(self):
+        """Build a new index from self.path off the event loop, then swap it in"""
+        async with self._reload_lock:
+            served = await asyncio.to_thread(load_index, self.path, self._version + 1)
+            self._version = served.version
+            # Requests in flight hold a reference to the old ServedIndex and finish with it
+            self.served = served
+            return served
+
+    def swap(self, index, source='memory', pattern_count=0):
+        """Serve an index that was built in this process"""
+        self._version += 1
+        self.served = ServedIndex(index, source, self._version, pattern_count)
+        return self.served
+
+    async def start(self):
+        if self.served is None:
+            await self.reload()
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        if hasattr(signal, 'SIGHUP'):
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGHUP, lambda: asyncio.ensure_future(self._reload_logged()))
+        return self.port
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Serving {self.served.pattern_count:,} patterns on http://{self.host}:{self.port}",
+              file=sys.stderr, flush=True)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _reload_logged(self):
+        try:
+            served = await self.reload()
+            print(f"Reloaded {served.source} (version {served.version})", file=sys.stderr, flush=True)
+        except Exception as e:
+            print(f"Reload failed, keeping version {self.served.version}: {e}", file=sys.stderr, flush=True)
+
+    async def handle(self, reader, writer):
+        """One connection: requests are answered in order until the client closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, _encode({'error': 'malformed request line'}), False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+
+                body_read = False
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length > MAX_BODY:
+                        raise HTTPError(413, f"body larger than {MAX_BODY} bytes")
+                    body = await reader.readexactly(length) if length else b''
+                    body_read = True
+                    status, payload = 200, await self.route(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, _encode({'error': str(e)})
+                except ValueError as e:
+                    status, payload = 400, _encode({'error': str(e)})
+                except Exception as e:
+                    status, payload = 500, _encode({'error': str(e)})
+
+                # An unread body (bad Content-Length, too large) would be parsed as the next request
+                keep_alive = keep_alive and body_read
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+        await writer.drain()
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == '/recommend':
+            if method == 'GET':
+                return self.recommend(parse_qs(url.query))
+            if method == 'POST':
+                return self.recommend_batch(body)
+        elif url.path == '/health':
+            if method == 'GET':
+                return _encode({'status': 'ok', **self.served.info()})
+        elif url.path == '/reload':
+            if method == 'POST':
+                try:
+                    served = await self.reload()
+                except Exception as e:
+                    raise HTTPError(500, f"reload failed, still serving version {self.served.version}: {e}")
+                return _encode({'status': 'reloaded', **served.info()})
+        else:
+            raise HTTPError(404, f"no such endpoint: {url.path}")
+        raise HTTPError(405, f"{method} not allowed on {url.path}")
+
+    def _options(self, k, min_confidence):
+        try:
+            k = self.default_k if k is None else int(k)
+        except (TypeError, ValueError):
+            raise ValueError("k must be a positive integer")
+        try:
+            min_confidence = 0.0 if min_confidence is None else float(min_confidence)
+        except (TypeError, ValueError):
+            raise ValueError("min_confidence must be a number")
+        if k < 1:
+            raise ValueError("k must be a positive integer")
+        if not math.isfinite(min_confidence):
+            raise ValueError("min_confidence must be a finite number")
+        return k, min_confidence
+
+    def recommend(self, query):
+        if 'item' not in query:
+            raise ValueError("missing query parameter: item")
+        item = query['item'][0]
+        k, min_confidence = self._options(query.get('k', [None])[0], query.get('min_confidence', [None])[0])
+
+        served = self.served
+        key = (item, k, min_confidence)
+        payload = served.responses.get(key)
+        if payload is None:
+            payload = _encode({'item': item, 'version': served.version,
+                               'recommendations': _entries(served.index.recommend(item, k, min_confidence))})
+            if len(served.responses) >= RESPONSE_CACHE_SIZE:
+                served.responses.clear()
+            served.responses[key] = payload
+        return payload
+
+    def recommend_batch(self, body):
+        try:
+            request = json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON body: {e}")
+        if not isinstance(request, dict):
+            raise ValueError("body must be a JSON object")
+        k, min_confidence = self._options(request.get('k'), request.get('min_confidence'))
+
+        # Whole batch answered from one index, even if a reload finishes meanwhile
+        served = self.served
+        if 'items' in request:
+            if not isinstance(request['items'], list):
+                raise ValueError("'items' must be a list")
+            items = [str(item) for item in request['items']]
+            answers = served.index.recommend_many(items, k, min_confidence)
+            results = [{'item': item, 'recommendations': _entries(answer)}
+                       for item, answer in zip(items, answers)]
+        elif 'baskets' in request:
+            if not (isinstance(request['baskets'], list) and
+                    all(isinstance(basket, list) for basket in request['baskets'])):
+                raise ValueError("'baskets' must be a list of lists")
+            baskets = [[str(item) for item in basket] for basket in request['baskets']]
+            answers = served.index.recommend_baskets(baskets, k, min_confidence)
+            results = [{'basket': basket, 'recommendations': _entries(answer)}
+                       for basket, answer in zip(baskets, answers)]
+        else:
+            raise ValueError("body needs 'items' or 'baskets'")
+        return _encode({'version': served.version, 'results': results})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve next-item recommendations over HTTP")
+    parser.add_argument('patterns', help="pattern file written by `cli.py mine` (.csv, .json, .jsonl, .parquet)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help="0 picks a free port")
+    parser.add_argument('--k', type=int, default=20, help="recommendations per item when k is not given")
+    args = parser.parse_args(argv)
+
+    server = RecommendationServer(args.patterns, args.host, args.port, args.k)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except (ValueError, OSError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
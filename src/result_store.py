@@ -0,0 +1,111 @@
+"""
+Store of frequent sequences mined at past thresholds.
+
+Every pattern frequent at min_support s is also in the result of any run
+at a lower support, with the same count, so a run at support s answers all
+queries at supports >= s by filtering. Entries are keyed by the content of
+the sequence database (SequenceDatabase.fingerprint) and can be saved as
+JSON, so a low-support run can be paid for once and reused later. The
+least recently used files are removed once there are more than
+max_disk_entries.
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+from atomic_write import atomic_write, remove_oldest, touch
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'data', 'cache', 'results')
+# Result files: the database fingerprint, then a hash of non-default options
+# (SPADEAlgorithm.result_key); staging files of atomic_write do not match
+ENTRY_NAME = re.compile(r'[0-9a-f]{40}(-[0-9a-f]{12})?\.json')
+
+
+class StoredResult:
+    """Patterns of one run, sorted by support count (descending)"""
+    def __init__(self, min_support, sequence_count, patterns, counts):
+        self.min_support = min_support
+        self.sequence_count = sequence_count
+        self.patterns = patterns            # list of itemset lists
+        self.counts = np.asarray(counts, dtype=np.int64)
+    
+    def select(self, min_support):
+        """frequent_sequences at a support >= self.min_support"""
+        # Same test as mining: count >= min_support * sequence_count
+        k = int(np.count_nonzero(self.counts >= min_support * self.sequence_count))
+        return [(pattern, count / self.sequence_count)
+                for pattern, count in zip(self.patterns[:k], self.counts[:k].tolist())]
+    
+    def to_json(self):
+        return {'min_support': self.min_support, 'sequence_count': self.sequence_count,
+                'patterns': self.patterns, 'counts': self.counts.tolist()}
+    
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['min_support'], data['sequence_count'], data['patterns'], data['counts'])
+
+
+class ResultStore:
+    def __init__(self, directory=RESULTS_DIR, max_disk_entries=32):
+        """
+        directory: where results are saved as <fingerprint>.json (None for memory only).
+        max_disk_entries: number of results kept on disk.
+        """
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._results = {}
+    
+    def lookup(self, key, min_support):
+        """frequent_sequences for min_support, or None if nothing low enough was mined"""
+        result = self._results.get(key)
+        if result is None:
+            result = self._read(key)
+            if result is not None:
+                self._results[key] = result
+        if result is None or min_support < result.min_support:
+            return None
+        return result.select(min_support)
+    
+    def save(self, key, min_support, sequence_count, frequent_sequences):
+        """Keep the run if it covers more thresholds than the stored one"""
+        stored = self._results.get(key) or self._read(key)
+        if stored is not None and stored.min_support <= min_support:
+            self._results[key] = stored
+            return
+        
+        # Stable sort keeps the mining order among equal supports
+        ordered = sorted(frequent_sequences, key=lambda x: x[1], reverse=True)
+        result = StoredResult(min_support, sequence_count, [pattern for pattern, _ in ordered],
+                              [round(support * sequence_count) for _, support in ordered])
+        self._results[key] = result
+        self._write(key, result)
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+    
+    def _read(self, key):
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                result = StoredResult.from_json(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+        touch(self._path(key))
+        return result
+    
+    def _write(self, key, result):
+        if self.directory is None:
+            return
+        try:
+            with atomic_write(self._path(key), suffix='.json') as staging:
+                with open(staging, 'w', encoding='utf-8') as f:
+                    json.dump(result.to_json(), f)
+        except (OSError, TypeError):
+            # Read-only location or labels JSON cannot store: keep it in memory only
+            return
+        remove_oldest([self._path(name[:-len('.json')]) for name in os.listdir(self.directory)
+                       if ENTRY_NAME.fullmatch(name)], self.max_disk_entries)
@@ -0,0 +1,139 @@
+"""
+Cache of preprocessed sequence databases.
+
+Building a SequenceDatabase only depends on the CustomerID, InvoiceNo,
+InvoiceDate and StockCode columns, so the cache key is a content hash of
+those columns. Entries are kept in memory for repeated runs in one session
+and as plain .npy files on disk (one directory per key), which are loaded
+memory-mapped on a cold start. The least recently used directories are
+removed once there are more than max_disk_entries.
+"""
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from atomic_write import atomic_write, remove_oldest, touch
+from spade_algorithm import SEQUENCE_COLUMNS, SequenceDatabase, build_sequence_arrays
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache')
+# Bump when build_sequence_arrays or the file layout changes
+CACHE_VERSION = 2
+
+# Arrays stored for every entry: database fields, then the vertical layout
+# (times arrays are empty when the database has no times)
+DATABASE_FIELDS = ('customers', 'items', 'seq_index', 'positions', 'item_codes', 'times')
+VERTICAL_FIELDS = ('vertical_items', 'vertical_sids', 'vertical_eids', 'vertical_times', 'vertical_bounds')
+# Entry directories are named by frame_fingerprint; the directory also holds
+# staging directories and the result store
+ENTRY_NAME = re.compile(r'[0-9a-f]{40}')
+
+
+def frame_fingerprint(df):
+    """Content hash of the columns the sequence database is built from"""
+    digest = hashlib.sha1(f"v{CACHE_VERSION}:{len(df)}".encode())
+    for column in SEQUENCE_COLUMNS:
+        digest.update(column.encode())
+        digest.update(pd.util.hash_pandas_object(df[column], index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _value_array(values):
+    """Labels as a plain numpy array (strings become unicode), None if mixed types"""
+    if values.dtype != object:
+        return values
+    values = values.tolist()
+    if len({type(value) for value in values}) > 1:
+        return None
+    return np.asarray(values)
+
+
+def _label_array(values):
+    """Inverse of _value_array: unicode labels back to an object array of str"""
+    values = np.asarray(values)
+    return values.astype(object) if values.dtype.kind == 'U' else values
+
+
+class SequenceCache:
+    def __init__(self, directory=CACHE_DIR, max_entries=4, max_disk_entries=16):
+        """
+        directory: where cached databases are written (None for memory only).
+        max_entries: number of databases kept in memory.
+        max_disk_entries: number of databases kept on disk.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+    
+    def load(self, df):
+        """SequenceDatabase for df: from memory, from disk, or freshly built"""
+        key = frame_fingerprint(df)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        
+        database = self._read(key)
+        if database is None:
+            database = build_sequence_arrays(df)
+            self._write(key, database)
+        
+        self._memory[key] = database
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+        return database
+    
+    def clear(self):
+        """Drop the in-memory entries (files on disk are kept)"""
+        self._memory.clear()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+    
+    def _read(self, key):
+        if self.directory is None or not os.path.isdir(self._path(key)):
+            return None
+        try:
+            arrays = {field: np.load(os.path.join(self._path(key), field + '.npy'), mmap_mode='r')
+                      for field in DATABASE_FIELDS + VERTICAL_FIELDS}
+        except (OSError, ValueError):
+            # Incomplete or corrupt entry: rebuild it
+            return None
+        
+        if len(arrays['times']) != len(arrays['item_codes']):
+            arrays['times'] = arrays['vertical_times'] = None
+        
+        touch(self._path(key))
+        # Labels back to the object arrays build_sequence_arrays produces
+        database = SequenceDatabase(_label_array(arrays['customers']), _label_array(arrays['items']),
+                                    arrays['seq_index'], arrays['positions'], arrays['item_codes'],
+                                    arrays['times'])
+        database._vertical = tuple(arrays[field] for field in VERTICAL_FIELDS)
+        return database
+    
+    def _write(self, key, database):
+        if self.directory is None:
+            return
+        customers = _value_array(database.customers)
+        items = _value_array(database.items)
+        if customers is None or items is None:
+            return
+        
+        arrays = dict(zip(DATABASE_FIELDS, (customers, items, database.seq_index,
+                                            database.positions, database.item_codes, database.times)))
+        arrays.update(zip(VERTICAL_FIELDS, database.vertical_layout()))
+        for field in ('times', 'vertical_times'):
+            if arrays[field] is None:
+                arrays[field] = np.empty(0, dtype=np.int64)
+        try:
+            with atomic_write(self._path(key), directory=True) as staging:
+                for field, values in arrays.items():
+                    np.save(os.path.join(staging, field + '.npy'), np.asarray(values))
+        except OSError:
+            # Read-only location or concurrent writer: the cache is optional
+            return
+        remove_oldest([self._path(name) for name in os.listdir(self.directory) if ENTRY_NAME.fullmatch(name)],
+                      self.max_disk_entries)
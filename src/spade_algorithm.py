@@ -1,136 +1,1311 @@
-from collections import defaultdict
+import hashlib
+import heapq
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from bitmap_engine import bitmap_density, id_list_to_bitmap, words_per_sequence
+
+# Columns a sequence database is built from
+SEQUENCE_COLUMNS = ['CustomerID', 'InvoiceNo', 'InvoiceDate', 'StockCode']
+
+# Gap and window constraints in seconds, None when unbounded
+TimeConstraints = namedtuple('TimeConstraints', ['min_gap', 'max_gap', 'max_window'])
+
+# Passed to the progress callback of SPADEAlgorithm. level: length of the
+# patterns being generated; classes: of the current BFS level, or the root
+# classes (one per frequent item) for depth-first and parallel runs;
+# fraction: estimated share of those classes done
+MiningProgress = namedtuple('MiningProgress', ['stage', 'level', 'classes_done', 'classes_total',
+                                               'candidates', 'patterns', 'fraction'])
+
+
+class MiningCancelled(Exception):
+    """Raised inside a mining run after SPADEAlgorithm.cancel()"""
+
+class SequenceDatabase:
+    """
+    Integer-encoded sequence database.
+
+    Every entry is one item occurrence inside one itemset of one customer
+    sequence. Entries are stored in traversal order: by customer, then by
+    itemset position, then by first appearance of the item in the itemset.
+    """
+    def __init__(self, customers, items, seq_index, positions, item_codes, times=None):
+        self.customers = customers      # sid -> CustomerID
+        self.items = items              # item code -> StockCode
+        self.seq_index = seq_index      # sid of every entry
+        self.positions = positions      # itemset position (eid) of every entry
+        self.item_codes = item_codes    # item code of every entry
+        self.times = times              # InvoiceDate of every entry, seconds since the first one (or None)
+        self._sequences = None
+        self._vertical = None
+    
+    def __len__(self):
+        return len(self.item_codes)
+    
+    @property
+    def sequence_count(self):
+        return len(self.customers)
+    
+    def itemset_starts(self):
+        """Indices of the entries that open a new itemset"""
+        new_itemset = np.ones(len(self), dtype=bool)
+        new_itemset[1:] = ((self.seq_index[1:] != self.seq_index[:-1]) |
+                           (self.positions[1:] != self.positions[:-1]))
+        return np.flatnonzero(new_itemset)
+    
+    def to_sequences(self):
+        """Yield (CustomerID, list of itemsets) for every sequence"""
+        values = self.items[self.item_codes].tolist()
+        starts = self.itemset_starts()
+        bounds = np.append(starts, len(self)).tolist()
+        seq_bounds = np.searchsorted(self.seq_index[starts],
+                                     np.arange(self.sequence_count + 1)).tolist()
+        
+        for sid, customer_id in enumerate(self.customers.tolist()):
+            yield customer_id, [values[bounds[k]:bounds[k + 1]]
+                                for k in range(seq_bounds[sid], seq_bounds[sid + 1])]
+    
+    def fingerprint(self):
+        """Content hash of the database, to key results mined from it"""
+        digest = hashlib.sha1()
+        for labels in (self.customers, self.items):
+            digest.update('\x00'.join(map(str, labels.tolist())).encode())
+        for values in (self.seq_index, self.positions, self.item_codes, self.times):
+            if values is not None:
+                digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.hexdigest()
+    
+    def sequence_dict(self):
+        """CustomerID -> list of itemsets, built once per database"""
+        if self._sequences is None:
+            self._sequences = dict(self.to_sequences())
+        return self._sequences
+    
+    def vertical_layout(self):
+        """
+        Entries regrouped by item, built once per database.
+        Returns (item codes, sids, eids, times, bounds); the id-list of
+        item_codes[k] is sids/eids/times[bounds[k]:bounds[k + 1]]. times is
+        None when the database has no times.
+        """
+        if self._vertical is None:
+            item_codes, order, bounds = self.group_by_item()
+            times = self.times[order] if self.times is not None else None
+            self._vertical = (item_codes, self.seq_index[order], self.positions[order], times, bounds)
+        return self._vertical
+    
+    def group_by_item(self):
+        """
+        Group entries by item, items in order of first appearance.
+        Returns (item codes, entry order, bounds into the entry order).
+        """
+        appearance, item_codes = pd.factorize(self.item_codes)
+        order = np.argsort(appearance, kind='stable')
+        bounds = np.searchsorted(appearance[order], np.arange(len(item_codes) + 1))
+        return item_codes, order, bounds
+
+
+def date_seconds(dates):
+    """
+    Seconds since the first of the sorted unique dates from pd.factorize,
+    with one extra slot for missing dates (sorted last). None if the dates
+    are not datetimes.
+    """
+    try:
+        dates = pd.DatetimeIndex(dates)
+    except (TypeError, ValueError):
+        return None
+    if len(dates) == 0:
+        return np.zeros(1, dtype=np.int64)
+    seconds = np.asarray((dates - dates[0]) // pd.Timedelta(seconds=1), dtype=np.int64)
+    return np.append(seconds, seconds[-1])
+
+
+def build_sequence_arrays(df):
+    """
+    Vectorized sequence-database builder.
+    
+    Factorizes CustomerID/InvoiceNo/StockCode to integer codes once, sorts by
+    (CustomerID, InvoiceDate), finds itemset boundaries where the customer or
+    invoice changes and drops repeated items inside an itemset.
+    """
+    df = df[df['CustomerID'].notna()]
+    
+    customer_codes, customers = pd.factorize(df['CustomerID'], sort=True)
+    date_codes, dates = pd.factorize(df['InvoiceDate'], sort=True)
+    date_codes[date_codes < 0] = len(dates)  # missing dates sort last, as in sort_values
+    invoice_codes, _ = pd.factorize(df['InvoiceNo'], use_na_sentinel=False)
+    item_codes, items = pd.factorize(df['StockCode'], sort=True, use_na_sentinel=False)
+    
+    # Date codes are kept as the entry times and only then turned into seconds
+    database = encoded_sequence_database(customer_codes, customers, date_codes, invoice_codes, item_codes, items,
+                                         date_codes)
+    seconds = date_seconds(dates)
+    database.times = seconds[database.times] if seconds is not None else None
+    return database
+
+
+def encoded_sequence_database(customer_codes, customers, date_keys, invoice_codes, item_codes, items, times):
+    """
+    SequenceDatabase of integer-coded rows: customer and item codes index the
+    sorted customers and items, date_keys sort like the invoice dates,
+    invoice codes only need to differ between invoices, times are the row
+    seconds (or None).
+    """
+    # Stable sort by customer, then invoice date
+    order = np.lexsort((date_keys, customer_codes))
+    seq_index = customer_codes[order]
+    item_codes = item_codes[order]
+    
+    # If new customer or new invoice, create new itemset (row-sized
+    # temporaries are dropped as soon as they are used)
+    invoices = invoice_codes[order]
+    new_itemset = np.ones(len(order), dtype=bool)
+    np.not_equal(invoices[1:], invoices[:-1], out=new_itemset[1:])
+    del invoices
+    new_itemset[1:] |= seq_index[1:] != seq_index[:-1]
+    itemset_index = np.cumsum(new_itemset, dtype=np.int64)
+    itemset_index -= 1
+    first_itemset = itemset_index[np.searchsorted(seq_index, np.arange(len(customers)))]
+    positions = itemset_index - first_itemset[seq_index]
+    
+    # Keep only the first occurrence of an item inside its itemset
+    itemset_index *= max(len(items), 1)
+    itemset_index += item_codes
+    _, first = np.unique(itemset_index, return_index=True)
+    del itemset_index
+    first.sort()
+    
+    return SequenceDatabase(
+        customers=np.asarray(customers),
+        items=np.asarray(items, dtype=object),
+        seq_index=seq_index[first].astype(np.int32),
+        positions=positions[first].astype(np.int32),
+        item_codes=item_codes[first].astype(np.int32),
+        times=times[order[first]] if times is not None else None,
+    )
+
+
+class SequenceDatabaseBuilder:
+    """
+    Builds the SequenceDatabase of build_sequence_arrays from chunks of rows.
+    
+    Every chunk is reduced to integer columns (customer and item codes, an
+    invoice hash and the invoice date in nanoseconds, 24 bytes a row) so the
+    source frames can be dropped as soon as they are added; build() then
+    sorts them as build_sequence_arrays does. InvoiceDate must be datetimes.
+    """
+    MISSING_DATE = np.iinfo(np.int64).max  # sorts last, as NaT in build_sequence_arrays
+    
+    def __init__(self):
+        self.customers = {}     # CustomerID -> code, in order of appearance
+        self.items = {}         # StockCode -> code, in order of appearance
+        self.customer_dtype = None
+        self.chunks = []        # (customer codes, invoice hashes, item codes, dates) of every chunk
+        self.rows = 0
+    
+    def add(self, df):
+        """Encode the rows of df (CustomerID, InvoiceNo, InvoiceDate, StockCode)"""
+        df = df[df['CustomerID'].notna()]
+        if df.empty:
+            return
+        if self.customer_dtype is None:
+            self.customer_dtype = df['CustomerID'].dtype
+        dates = df['InvoiceDate'].to_numpy(dtype='datetime64[ns]').view(np.int64).copy()
+        dates[dates == np.iinfo(np.int64).min] = self.MISSING_DATE   # NaT
+        self.chunks.append((self.encode(df['CustomerID'], self.customers),
+                            self.invoice_hashes(df['InvoiceNo']),
+                            self.encode(df['StockCode'], self.items),
+                            dates))
+        self.rows += len(df)
+    
+    @staticmethod
+    def encode(values, codes):
+        """Codes of values in the running code table (labels added in order of appearance)"""
+        local, uniques = pd.factorize(values, use_na_sentinel=False)
+        labels = np.asarray(uniques, dtype=object).tolist()
+        new = [label for label in labels if label not in codes]
+        codes.update(zip(new, range(len(codes), len(codes) + len(new))))
+        return np.fromiter(map(codes.__getitem__, labels), dtype=np.int32, count=len(labels))[local]
+    
+    @staticmethod
+    def invoice_hashes(values):
+        """
+        64-bit hash of every InvoiceNo. Invoices are only compared between
+        neighbouring rows of one customer, so hashes stand in for a table of
+        every invoice number (there are about a quarter as many as rows).
+        """
+        local, uniques = pd.factorize(values, use_na_sentinel=False)
+        return pd.util.hash_array(np.asarray(uniques, dtype=object), categorize=False)[local]
+    
+    def build(self):
+        """The SequenceDatabase of all the rows added so far"""
+        if self.chunks:
+            # Keep the joined columns only, as one chunk
+            self.chunks = [tuple(map(np.concatenate, zip(*self.chunks)))]
+            customer_codes, invoice_hashes, item_codes, dates = self.chunks[0]
+        else:
+            customer_codes = item_codes = np.zeros(0, dtype=np.int32)
+            invoice_hashes = np.zeros(0, dtype=np.uint64)
+            dates = np.zeros(0, dtype=np.int64)
+        
+        # Codes in order of appearance -> codes of the sorted labels
+        customer_rank, customers = pd.factorize(pd.Index(list(self.customers), dtype=self.customer_dtype), sort=True)
+        item_rank, items = pd.factorize(pd.Index(list(self.items), dtype=object), sort=True, use_na_sentinel=False)
+        
+        database = encoded_sequence_database(customer_rank.astype(np.int32)[customer_codes], customers, dates,
+                                             invoice_hashes, item_rank.astype(np.int32)[item_codes], items, dates)
+        
+        # Seconds since the first date; missing dates get the last one, as in date_seconds
+        present = dates != self.MISSING_DATE
+        times = database.times
+        if present.any():
+            first = dates.min()
+            last = np.max(dates, where=present, initial=first)
+            times = np.where(times == self.MISSING_DATE, last, times)
+            database.times = (times - first) // 10**9
+        else:
+            database.times = np.zeros(len(times), dtype=np.int64)
+        return database
+
+
+def common_count(sids1, sids2):
+    """Number of values shared by two sorted arrays of unique sids"""
+    if min(len(sids1), len(sids2)) == 0:
+        return 0
+    idx = np.searchsorted(sids1, sids2)
+    np.minimum(idx, len(sids1) - 1, out=idx)
+    return int(np.count_nonzero(sids1[idx] == sids2))
+
+
+class IdList:
+    """
+    Compact vertical id-list: parallel int32 sid/eid arrays sorted by (sid, eid)
+    """
+    __slots__ = ('sids', 'eids', '_runs')
+    fields = ('sids', 'eids')
+    
+    def __init__(self, sids, eids):
+        self.sids = sids
+        self.eids = eids
+        self._runs = None
+    
+    def __len__(self):
+        return len(self.sids)
+    
+    @property
+    def nbytes(self):
+        return self.sids.nbytes + self.eids.nbytes
+    
+    def runs(self):
+        """
+        Per-sequence summary (sids, run offsets, min eid, max eid). Since the
+        list is sorted by (sid, eid) these are the first and last entries of
+        every sid run. Cached, since a class member takes part in many joins.
+        """
+        if self._runs is None:
+            starts = np.ones(len(self.sids), dtype=bool)
+            starts[1:] = self.sids[1:] != self.sids[:-1]
+            offsets = np.append(np.flatnonzero(starts), len(self.sids))
+            self._runs = (self.sids[starts], offsets, self.eids[starts], self.eids[offsets[1:] - 1])
+        return self._runs
+    
+    def support_count(self):
+        """Number of distinct sequences in the id-list"""
+        return len(self.runs()[0])
+    
+    def sequence_ids(self):
+        """Sorted distinct sids"""
+        return self.runs()[0]
+    
+    def sequence_join(self, other, min_count=0):
+        """
+        Temporal join: entries of other that come after this id-list.
+        
+        Both lists are sorted by (sid, eid), so this is a single merge over the
+        sids. Only the first occurrence of self in each sid matters: an entry
+        of other extends the sequence iff it comes after that one. The support
+        is known from the per-sequence summaries before any entry is copied;
+        returns None when it is below min_count.
+        """
+        first_sids, _, first_eids, _ = self.runs()
+        sids, offsets, _, last_eids = other.runs()
+        if len(first_sids) == 0 or len(sids) == 0:
+            return None if min_count > 0 else IdList(other.sids[:0], other.eids[:0])
+        
+        # Merge: locate every sid of other among the sids of self
+        idx = np.searchsorted(first_sids, sids)
+        np.minimum(idx, len(first_sids) - 1, out=idx)
+        
+        # Sequences where the last occurrence of other follows the first of self
+        extends = (first_sids[idx] == sids) & (first_eids[idx] < last_eids)
+        if np.count_nonzero(extends) < min_count:
+            return None
+        
+        # Same sequence and positions properly ordered
+        limits = np.where(extends, first_eids[idx], np.iinfo(np.int32).max)
+        keep = other.eids > np.repeat(limits, np.diff(offsets))
+        return IdList(other.sids[keep], other.eids[keep])
+    
+    def itemset_join(self, other, min_count=0):
+        """
+        Equality join: entries present in both lists (same sid and eid).
+        Returns None when fewer than min_count sequences contain both.
+        """
+        if min_count > 0 and common_count(self.runs()[0], other.runs()[0]) < min_count:
+            return None
+        
+        keys = self.keys()
+        other_keys = other.keys()
+        if len(keys) == 0:
+            return IdList(self.sids[:0], self.eids[:0])
+        
+        idx = np.searchsorted(keys, other_keys)
+        np.minimum(idx, len(keys) - 1, out=idx)
+        keep = keys[idx] == other_keys
+        return IdList(other.sids[keep], other.eids[keep])
+    
+    def has_entries_of(self, other):
+        """True if other, an id-list joined from this one, kept all its entries"""
+        return len(other) == len(self)
+    
+    def keys(self):
+        """(sid, eid) packed into one sortable int64 per entry"""
+        return (self.sids.astype(np.int64) << 32) | self.eids.astype(np.int64)
+    
+    def to_tuples(self):
+        """(sid, eid) pairs, mainly for debugging"""
+        return list(zip(self.sids.tolist(), self.eids.tolist()))
+
+
+class TimedIdList(IdList):
+    """
+    Id-list for gap and window constraints (cSPADE): every entry also carries
+    the time of its itemset and the latest start time of an occurrence of
+    the pattern ending there. A later start is always better for max_window,
+    so one start per entry is enough.
+    """
+    __slots__ = ('times', 'starts', '_start_table')
+    fields = ('sids', 'eids', 'times', 'starts')
+    
+    def __init__(self, sids, eids, times, starts):
+        super().__init__(sids, eids)
+        self.times = times
+        self.starts = starts
+        self._start_table = None
+    
+    @property
+    def nbytes(self):
+        return super().nbytes + self.times.nbytes + self.starts.nbytes
+    
+    def start_table(self):
+        """
+        Sparse table for range maxima of starts: row j holds the maximum of
+        every window of 2**j entries. Cached, since a prefix is joined with
+        many items.
+        """
+        if self._start_table is None:
+            table = [np.asarray(self.starts, dtype=np.int64)]
+            width = 1
+            while 2 * width <= len(self.starts):
+                previous = table[-1]
+                table.append(np.maximum(previous[:-width], previous[width:]))
+                width *= 2
+            self._start_table = table
+        return self._start_table
+    
+    def constrained_join(self, other, constraints, min_count=0):
+        """
+        Temporal join under gap and window constraints: entries of other that
+        come min_gap..max_gap seconds after an entry of self, within
+        max_window of that occurrence's start. Unlike sequence_join every
+        entry of self matters, so the candidates of each entry of other are
+        a range of self (entries are sorted by sid and time too), located by
+        binary search; the best start in that range comes from start_table.
+        Returns None when fewer than min_count sequences remain.
+        """
+        if len(self) == 0 or len(other) == 0:
+            return None if min_count > 0 else TimedIdList(other.sids[:0], other.eids[:0],
+                                                          other.times[:0], other.starts[:0])
+        min_gap, max_gap, max_window = constraints
+        span = int(max(self.times.max(), other.times.max())) + 1
+        keys = self.sids.astype(np.int64) * span + self.times
+        sid_base = other.sids.astype(np.int64) * span
+        
+        # Entries of self in an earlier itemset of the same sequence...
+        high = np.searchsorted(self.keys(), other.keys())
+        if min_gap:
+            high = np.minimum(high, np.searchsorted(keys, sid_base + other.times - min_gap, 'right'))
+        # ... and not more than max_gap before
+        if max_gap is not None:
+            low = np.searchsorted(keys, sid_base + np.maximum(other.times - max_gap, 0))
+        else:
+            low = np.searchsorted(keys, sid_base)
+        keep = low < high
+        
+        starts = other.times
+        if max_window is not None:
+            table = self.start_table()
+            low, high = low[keep], high[keep]
+            level = np.frexp(high - low)[1] - 1   # floor(log2(range length))
+            best = np.empty(len(low), dtype=np.int64)
+            for j in np.unique(level).tolist():
+                rows = level == j
+                best[rows] = np.maximum(table[j][low[rows]], table[j][high[rows] - (1 << j)])
+            starts = np.zeros(len(other), dtype=np.int64)
+            starts[keep] = best
+            keep[keep] = other.times[keep] - best <= max_window
+        
+        sids = other.sids[keep]
+        if min_count > 0 and (np.count_nonzero(np.diff(sids)) + 1 if len(sids) else 0) < min_count:
+            return None
+        return TimedIdList(sids, other.eids[keep], other.times[keep], starts[keep])
+    
+    def itemset_join(self, other, min_count=0):
+        """Equality join keeping the starts of self's occurrences"""
+        if min_count > 0 and common_count(self.runs()[0], other.runs()[0]) < min_count:
+            return None
+        
+        keys = self.keys()
+        other_keys = other.keys()
+        if len(keys) == 0:
+            return TimedIdList(self.sids[:0], self.eids[:0], self.times[:0], self.starts[:0])
+        
+        idx = np.searchsorted(keys, other_keys)
+        np.minimum(idx, len(keys) - 1, out=idx)
+        keep = keys[idx] == other_keys
+        return TimedIdList(other.sids[keep], other.eids[keep], other.times[keep], self.starts[idx[keep]])
+
+
+# Kinds of class members: sequence extension (new itemset) and itemset
+# extension (same itemset as the previous item)
+S_STEP = 's'
+I_STEP = 'i'
+
+
+def extend_pattern(pattern, member):
+    """
+    Append a class member (item, step, ...) to a pattern, a tuple of itemsets
+    (tuples of item ids)
+    """
+    item, step = member[0], member[1]
+    if step == I_STEP:
+        return pattern[:-1] + (pattern[-1] + (item,),)
+    return pattern + ((item,),)
+
+
+def split_pattern(pattern):
+    """Inverse of extend_pattern: (prefix, (last item, step))"""
+    last = pattern[-1]
+    if len(last) > 1:
+        return pattern[:-1] + (last[:-1],), (last[-1], I_STEP)
+    return pattern[:-1], (last[0], S_STEP)
+
+
+def prefix_chain(pattern):
+    """All proper prefixes of a pattern along split_pattern, longest first"""
+    chain = []
+    while pattern:
+        pattern = split_pattern(pattern)[0]
+        chain.append(pattern)
+    return chain
+
+
+def is_subsequence(pattern, sequence):
+    """True if the itemsets of pattern are contained, in order, in itemsets of sequence"""
+    k = 0
+    for itemset in sequence:
+        if k < len(pattern) and pattern[k] <= itemset:
+            k += 1
+    return k == len(pattern)
+
+
+def filter_closed(frequent_sequences, maximal=False):
+    """
+    Keep the closed patterns (no super-pattern with the same support) or the
+    maximal ones (no frequent super-pattern) of a complete result list whose
+    entries carry a third element: a key of their sid set.
+    
+    A super-pattern with the same support occurs in exactly the same
+    sequences, so closed candidates are only compared within a sid-set key.
+    Every frequent pattern is inside some maximal one, so maximal candidates
+    are only compared with the maximal patterns kept so far (largest first).
+    """
+    groups = defaultdict(list)
+    for entry in frequent_sequences:
+        groups[entry[2]].append(entry)
+    
+    closed = []
+    for group in groups.values():
+        itemsets = [[frozenset(itemset) for itemset in sequence] for sequence, _, _ in group]
+        sizes = [sum(map(len, sequence)) for sequence in itemsets]
+        for k, (sequence, support, _) in enumerate(group):
+            if not any(sizes[j] > sizes[k] and is_subsequence(itemsets[k], itemsets[j])
+                       for j in range(len(group))):
+                closed.append((sequence, support, itemsets[k], sizes[k]))
+    
+    if maximal:
+        kept = []
+        index = defaultdict(set)    # item -> maximal patterns containing it
+        for sequence, support, itemsets, size in sorted(closed, key=lambda entry: -entry[3]):
+            candidates = sorted((index[item] for item in set().union(*itemsets)), key=len)
+            if not any(is_subsequence(itemsets, kept[j][2]) for j in candidates[0].intersection(*candidates[1:])):
+                for item in set().union(*itemsets):
+                    index[item].add(len(kept))
+                kept.append((sequence, support, itemsets))
+        closed = kept
+    
+    # Back to the mining order (by support, descending)
+    order = {id(sequence): k for k, (sequence, _, _) in enumerate(frequent_sequences)}
+    closed.sort(key=lambda entry: order[id(entry[0])])
+    return [(sequence, support) for sequence, support, *_ in closed]
+
+
+def to_seconds(value):
+    """A gap or window as seconds: numbers are days, anything else goes through pd.Timedelta"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 86400)
+    return int(pd.Timedelta(value).total_seconds())
+
+
+def count_patterns(database, patterns, weights=None):
+    """
+    Support counts of patterns given as tuples of itemsets of StockCodes.
+    
+    Meant for small databases (the sequences changed by an update): every
+    item is a dict sid -> bitmask of its itemsets in plain Python ints, which
+    is much cheaper than numpy calls on a handful of sequences. Each pattern
+    is joined from its prefix (see split_pattern), so shared prefixes are
+    joined once and extensions of missing patterns are never joined. With
+    weights (one per sid) the weights of the supporting sequences are summed
+    instead of counted.
+    """
+    items = database.items.tolist()
+    masks = defaultdict(dict)
+    for sid, eid, code in zip(database.seq_index.tolist(), database.positions.tolist(),
+                              database.item_codes.tolist()):
+        item_masks = masks[((items[code],),)]
+        item_masks[sid] = item_masks.get(sid, 0) | (1 << eid)
+    masks = dict(masks)
+    
+    def pattern_masks(pattern):
+        if pattern not in masks:
+            prefix, (item, step) = split_pattern(pattern)
+            prefix_masks = pattern_masks(prefix) if prefix else {}
+            item_masks = masks.get(((item,),), {})
+            joined = {}
+            for sid, mask in prefix_masks.items():
+                other = item_masks.get(sid, 0)
+                if step == S_STEP:
+                    # Bits strictly after the first set bit of the prefix
+                    other &= ~((mask & -mask) * 2 - 1)
+                else:
+                    other &= mask
+                if other:
+                    joined[sid] = other
+            masks[pattern] = joined
+        return masks[pattern]
+    
+    if weights is None:
+        return {pattern: len(pattern_masks(pattern)) for pattern in patterns}
+    weights = weights.tolist()
+    return {pattern: sum(weights[sid] for sid in pattern_masks(pattern)) for pattern in patterns}
+
 
 class SPADEAlgorithm:
-    def __init__(self, min_support=0.01):
+    # Bitmaps win once this fraction of their bits is set (see bitmap_density)
+    BITMAP_MIN_DENSITY = 0.025
+    # update() recounts changed sequences in pure Python; past this fraction
+    # of changed sequences a full run is faster (see bench_incremental)
+    INCREMENTAL_MAX_CHANGED = 0.05
+    # Seconds between two progress callbacks; cancel() is checked every
+    # PROGRESS_CHECK candidates
+    PROGRESS_INTERVAL = 0.1
+    PROGRESS_CHECK = 64
+    
+    def __init__(self, min_support=0.01, search='bfs', engine='auto', n_jobs=1, early_pruning=True,
+                 incremental=False, result_store=None, top_k=None, min_length=1, output='all',
+                 max_length=None, min_gap=None, max_gap=None, max_window=None, progress=None):
+        """
+        search: 'bfs' mines level by level and keeps every level's id-lists in
+        vertical_db; 'dfs' mines one equivalence class at a time and frees its
+        id-lists once its subtree is done, so memory is bounded by
+        (pattern length x class width).
+        
+        engine: 'idlist' (sorted sid/eid arrays), 'bitmap' (one packed bit
+        vector per sequence) or 'auto' to pick by the measured density of the
+        frequent items.
+        
+        n_jobs: number of worker processes mining the classes rooted at each
+        frequent item (-1 for all CPUs). Workers always mine depth-first.
+        
+        early_pruning: check a cheap support bound from per-sequence summaries
+        before materializing a joined id-list (see add_if_frequent).
+        
+        incremental: keep the transactions and the exact support of every
+        evaluated candidate (frequent patterns and their negative border) so
+        that update() can add new transactions without mining from scratch.
+        Early pruning is disabled, since pruned candidates have no exact count.
+        
+        result_store: a ResultStore; runs at a support at or above one
+        already mined on the same database are answered by filtering it.
+        
+        top_k: keep only the top_k most frequent patterns. min_support is then
+        a floor: the threshold rises to the support of the k-th best pattern
+        found so far, which prunes the classes that cannot reach the top k.
+        
+        min_length: only report patterns with at least this many items
+        (shorter ones are still extended).
+        
+        output: 'all' frequent patterns, only 'closed' ones (no super-pattern
+        with the same support, so every support can still be derived) or only
+        'maximal' ones. Both mine depth-first and skip the classes that cannot
+        hold a closed pattern (see absorbed_members).
+        
+        max_length: do not extend patterns with this many items.
+        
+        min_gap, max_gap: bounds on the time between consecutive itemsets of
+        an occurrence; max_window: bound on the time between its first and
+        last itemset. In days, or anything pd.Timedelta accepts. They are
+        checked inside the joins (see TimedIdList), which needs the idlist
+        engine and InvoiceDate times.
+        
+        progress: called with a MiningProgress at each stage ('database' built,
+        frequent 'items' found, 'mining', 'done') and at most every
+        PROGRESS_INTERVAL seconds while mining, on the thread that mines.
+        cancel() stops the current run from another thread: preprocess_data,
+        find_frequent_sequences or update raise MiningCancelled, and the
+        partial state of the miner should be discarded.
+        """
+        if search not in ('bfs', 'dfs'):
+            raise ValueError(f"Unknown search strategy: {search}")
+        if engine not in ('auto', 'idlist', 'bitmap'):
+            raise ValueError(f"Unknown engine: {engine}")
+        if output not in ('all', 'closed', 'maximal'):
+            raise ValueError(f"Unknown output mode: {output}")
+        if top_k is not None and incremental:
+            raise ValueError("top_k cannot be combined with incremental mining")
+        if output != 'all' and (top_k is not None or incremental):
+            raise ValueError(f"{output} output cannot be combined with top_k or incremental mining")
+        constraints = TimeConstraints(to_seconds(min_gap), to_seconds(max_gap), to_seconds(max_window))
+        if any(value is not None for value in constraints):
+            if engine == 'bitmap':
+                raise ValueError("Gap and window constraints need the idlist engine")
+            if incremental:
+                raise ValueError("Gap and window constraints cannot be combined with incremental mining")
+        else:
+            constraints = None
         self.min_support = min_support
+        self.search = 'dfs' if output != 'all' else search
+        self.engine = engine
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+        self.early_pruning = early_pruning and not incremental
+        self.incremental = incremental
+        self.result_store = result_store
+        self.top_k = top_k
+        self.min_length = min_length
+        self.output = output
+        self.max_length = max_length
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.max_window = max_window
+        self.constraints = constraints
+        # Constrained mode: frequent item ids, and the items that extend each
+        # item in a frequent 2-pattern (see extend_member_constrained)
+        self.frequent_item_ids = []
+        self.extensions = {}
+        # Top-k state: heap of (count, -discovery order, pattern) and the
+        # support count of its smallest entry once it holds top_k patterns
+        self.top_patterns = []
+        self.top_k_count = 0
+        self.top_k_order = 0
+        self.stats = {'candidates': 0, 'pruned_early': 0, 'joined': 0}
+        self.progress = progress
+        self.progress_level = 0
+        self.classes_done = 0
+        self.classes_total = 0
+        # [done, total] of the class being mined below the current root class
+        self.subclasses = [0, 1]
+        self._progress_time = 0.0
+        self._cancel = threading.Event()
+        self.selected_engine = None
         self.frequent_sequences = []
         self.sequence_db = defaultdict(list)
         self.vertical_db = defaultdict(list)
         self.sequence_count = 0
+        self.database = None
+        self.item_ids = {}
+        # Incremental state: source rows, counts of the current run by pattern
+        # of item ids, and counts of all evaluated candidates by StockCodes
+        self.transactions = None
+        self.candidate_counts = {}
+        self.tracked_counts = None
         
-    def preprocess_data(self, df):
+    def preprocess_data(self, df, cache=None):
         """
-        Convert transactions to sequence database format
+        Convert transactions to sequence database format.
+        With a SequenceCache the database is reused across runs (see sequence_cache).
         """
-        # Group by CustomerID and sort by InvoiceDate
-        df_sorted = df.sort_values(by=['CustomerID', 'InvoiceDate'])
+        if self.incremental:
+            self.transactions = df.loc[df['CustomerID'].notna(), SEQUENCE_COLUMNS]
         
-        # Create sequence database
-        for customer_id, group in df_sorted.groupby('CustomerID'):
-            sequence = []
-            prev_invoice = None
-            
-            for _, row in group.iterrows():
-                invoice = row['InvoiceNo']
-                item = row['StockCode']
-                
-                # If new invoice, create new itemset
-                if invoice != prev_invoice:
-                    sequence.append([item])
-                    prev_invoice = invoice
-                else:
-                    # Add item to current itemset if not already there
-                    if item not in sequence[-1]:
-                        sequence[-1].append(item)
-            
-            self.sequence_db[customer_id] = sequence
+        if cache is not None:
+            self.load_database(cache.load(df))
+        else:
+            self.load_database(build_sequence_arrays(df))
+        self.report_progress('database', force=True)
+    
+    def load_database(self, database):
+        """Use an already built SequenceDatabase"""
+        self.database = database
         
-        self.sequence_count = len(self.sequence_db)
+        # Create sequence database (shared with the SequenceDatabase, read-only)
+        self.sequence_db = database.sequence_dict()
+        self.sequence_count = database.sequence_count
         
-        # Create vertical database (id-lists)
-        for seq_id, sequence in self.sequence_db.items():
-            for pos, itemset in enumerate(sequence):
-                for item in itemset:
-                    self.vertical_db[item].append((seq_id, pos))
+        # Create vertical database (id-lists keyed by dense item id)
+        self.item_ids = {item: code for code, item in enumerate(database.items.tolist())}
+        item_codes, sids, eids, times, bounds = database.vertical_layout()
+        if self.constraints is not None and times is None:
+            raise ValueError("Gap and window constraints need datetime InvoiceDate values")
+        bounds = bounds.tolist()
+        self.vertical_db = defaultdict(list)
+        for k, item in enumerate(item_codes.tolist()):
+            entries = slice(bounds[k], bounds[k + 1])
+            if self.constraints is not None:
+                # A single item starts where it ends
+                self.vertical_db[item] = TimedIdList(sids[entries], eids[entries], times[entries], times[entries])
+            else:
+                self.vertical_db[item] = IdList(sids[entries], eids[entries])
     
     def find_frequent_items(self):
         """Find frequent 1-sequences"""
         frequent_items = {}
-        min_support_count = self.min_support * self.sequence_count
+        min_support_count = self.min_support_count()
         
-        for item, id_list in self.vertical_db.items():
+        frequent_ids = set()
+        for item_id, id_list in self.vertical_db.items():
             # Count unique sequences containing the item
-            unique_seqs = len(set(seq_id for seq_id, _ in id_list))
+            unique_seqs = id_list.support_count()
             
             if unique_seqs >= min_support_count:
+                item = self.database.items[item_id]
+                frequent_ids.add(item_id)
                 frequent_items[item] = unique_seqs / self.sequence_count
-                self.frequent_sequences.append(([item], unique_seqs / self.sequence_count))
+                self.record_pattern(((item_id,),), unique_seqs, id_list)
         
         # Filter vertical database to keep only frequent items
-        self.vertical_db = {item: id_list for item, id_list in self.vertical_db.items() 
-                            if item in frequent_items}
+        self.vertical_db = {item_id: id_list for item_id, id_list in self.vertical_db.items()
+                            if item_id in frequent_ids}
+        self.frequent_item_ids = sorted(frequent_ids)
+        self.extensions = {}
+        
+        # Convert to the selected vertical representation
+        self.selected_engine = self.select_engine()
+        if self.selected_engine == 'bitmap':
+            n_words = self.words_per_sequence()
+            self.vertical_db = {item_id: id_list_to_bitmap(id_list, n_words)
+                                for item_id, id_list in self.vertical_db.items()}
         
         return frequent_items
     
-    def id_list_join(self, id_list1, id_list2):
-        """Join two id-lists to form a new sequence"""
-        result = []
+    def words_per_sequence(self):
+        """Bitmap row width, from the longest sequence"""
+        max_length = int(self.database.positions.max()) + 1 if len(self.database) else 1
+        return words_per_sequence(max_length)
+    
+    def select_engine(self):
+        """Resolve engine='auto' from the density of the frequent items' id-lists"""
+        if self.constraints is not None:
+            return 'idlist'
+        if self.engine != 'auto':
+            return self.engine
+        density = bitmap_density(self.vertical_db.values(), self.words_per_sequence())
+        return 'bitmap' if density >= self.BITMAP_MIN_DENSITY else 'idlist'
+    
+    def id_list_join(self, id_list1, id_list2, min_count=0):
+        """
+        Join two id-lists (IdList or SequenceBitmap) to form a new sequence.
+        Returns None if the result is known to be below min_count.
+        """
+        if self.constraints is not None:
+            return id_list1.constrained_join(id_list2, self.constraints, min_count)
+        return id_list1.sequence_join(id_list2, min_count)
+    
+    def itemset_join(self, id_list1, id_list2, min_count=0):
+        """Equality join: both items in the same itemset (same sid and eid)"""
+        return id_list1.itemset_join(id_list2, min_count)
+    
+    def generate_candidate_sequences(self, classes):
+        """
+        Generate frequent k-sequences from the equivalence classes of frequent
+        (k-1)-sequences.
+        
+        A class groups the sequences sharing the same (k-2)-item prefix; each
+        member is (last item, S_STEP or I_STEP, id-list of the whole sequence).
+        Only members of the same class are joined, and each joined sequence
+        becomes a member of the class of its left parent.
+        """
+        new_classes = {}
+        self.progress_level = sum(map(len, next(iter(classes)))) + 2
+        self.classes_done = 0
+        self.classes_total = len(classes)
+        self.report_progress(force=True)
+        
+        for prefix, members in classes.items():
+            self.classes_done += 1
+            for member in members:
+                new_prefix = extend_pattern(prefix, member)
+                new_members = self.extend_member(new_prefix, member, members)
+                
+                if new_members:
+                    for new_member in new_members:
+                        self.vertical_db[extend_pattern(new_prefix, new_member)] = new_member[2]
+                    new_classes[new_prefix] = new_members
+        
+        return new_classes
+    
+    def extend_member(self, new_prefix, member, members):
+        """
+        Join one class member with every member of its class and record the
+        frequent results. new_prefix is the member's whole pattern. Returns the
+        members of the new class new_prefix.
         
-        # Convert first id-list to dictionary for faster lookup
-        seq_pos_dict = defaultdict(list)
-        for seq_id, pos in id_list1:
-            seq_pos_dict[seq_id].append(pos)
+        For a class P with members P+x and P+y:
+          P+s(x) with P+s(y) -> P+s(x)+s(y) (temporal join) and, if x < y,
+                                P+s(x)+i(y) (equality join)
+          P+i(x) with P+s(y) -> P+i(x)+s(y) (temporal join)
+          P+i(x) with P+i(y) -> P+i(x)+i(y) if x < y (equality join)
+        """
+        if self.max_length is not None and sum(map(len, new_prefix)) >= self.max_length:
+            return []
+        if self.constraints is not None:
+            return self.extend_member_constrained(new_prefix, member)
+        item1, step1, id_list1 = member
+        new_members = []
         
-        # Join with second id-list where positions are properly ordered
-        for seq_id, pos2 in id_list2:
-            if seq_id in seq_pos_dict:
-                for pos1 in seq_pos_dict[seq_id]:
-                    if pos1 < pos2:  # Ensure proper sequence ordering
-                        result.append((seq_id, pos2))
-                        break
+        for item2, step2, id_list2 in members:
+            if step2 == S_STEP:
+                # Sequence extension: item2 in a later itemset
+                self.add_if_frequent(new_prefix, (item2, S_STEP), id_list1, id_list2, new_members)
+            if item2 > item1 and step1 == step2:
+                # Itemset extension: item2 in the same itemset as item1
+                self.add_if_frequent(new_prefix, (item2, I_STEP), id_list1, id_list2, new_members)
         
-        return result
+        return new_members
     
-    def generate_candidate_sequences(self, frequent_items, k):
-        """Generate candidate k-sequences from frequent (k-1)-sequences"""
-        candidates = {}
+    def extend_member_constrained(self, new_prefix, member):
+        """
+        extend_member under gap and window constraints.
         
-        # Get all (k-1)-sequences
-        k_minus_1_sequences = [seq for seq, _ in self.frequent_sequences if len(seq) == k-1]
+        Dropping an itemset from the middle of an occurrence can break
+        max_gap or min_gap, so P+x may be infrequent while P+y+x is frequent:
+        siblings cannot be joined. Every extension is joined with the id-list
+        of the single item instead. Dropping the first or last item keeps the
+        constraints, so only the items that extend the member's item in a
+        frequent 2-pattern are tried; those are recorded while mining the
+        class of each single item.
+        """
+        item1, step1, id_list1 = member
+        candidates = self.extensions.get(item1)
+        if candidates is None:
+            candidates = [(item2, S_STEP) for item2 in self.frequent_item_ids]
+            candidates += [(item2, I_STEP) for item2 in self.frequent_item_ids if item2 > item1]
         
-        # Generate k-sequences by joining (k-1)-sequences
-        for i, seq1 in enumerate(k_minus_1_sequences):
-            for j in range(i, len(k_minus_1_sequences)):
-                seq2 = k_minus_1_sequences[j]
-                
-                # Check if prefixes match (all but last element)
-                if seq1[:-1] == seq2[:-1]:
-                    # Create new candidate sequence
-                    new_seq = seq1 + [seq2[-1]]
-                    
-                    # Get id-lists for the last items of both sequences
-                    id_list1 = self.vertical_db[seq1[-1]]
-                    id_list2 = self.vertical_db[seq2[-1]]
-                    
-                    # Join id-lists
-                    joined_id_list = self.id_list_join(id_list1, id_list2)
-                    
-                    # Calculate support
-                    support = len(set(seq_id for seq_id, _ in joined_id_list)) / self.sequence_count
-                    
-                    # If support meets minimum threshold, add to candidates
-                    if support >= self.min_support:
-                        candidates[tuple(new_seq)] = joined_id_list
-                        self.vertical_db[tuple(new_seq)] = joined_id_list
-                        self.frequent_sequences.append((new_seq, support))
-        
-        return candidates
+        new_members = []
+        for item2, step2 in candidates:
+            self.add_if_frequent(new_prefix, (item2, step2), id_list1, self.vertical_db[item2], new_members)
+        if new_prefix == ((item1,),):
+            self.extensions[item1] = [(item2, step2) for item2, step2, _ in new_members]
+        return new_members
+    
+    def add_if_frequent(self, prefix, extension, id_list1, id_list2, new_members):
+        """
+        Join two id-lists and keep the extension of prefix if it is frequent.
+        
+        With early pruning the candidate is rejected before its id-list is
+        materialized when an upper bound of its support is too low: first the
+        supports of both parents, then the per-sequence counts computed by the
+        join itself (exact for a sequence extension on id-lists, the shared
+        sequences otherwise).
+        """
+        item, step = extension
+        min_support_count = self.min_support_count()
+        self.stats['candidates'] += 1
+        if self.stats['candidates'] % self.PROGRESS_CHECK == 0:
+            self.report_progress()
+        
+        min_count = 0
+        if self.early_pruning:
+            if min(id_list1.support_count(), id_list2.support_count()) < min_support_count:
+                self.stats['pruned_early'] += 1
+                return
+            min_count = min_support_count
+        
+        if step == S_STEP:
+            joined_id_list = self.id_list_join(id_list1, id_list2, min_count)
+        else:
+            joined_id_list = self.itemset_join(id_list1, id_list2, min_count)
+        if joined_id_list is None:
+            self.stats['pruned_early'] += 1
+            return
+        self.stats['joined'] += 1
+        support_count = joined_id_list.support_count()
+        if self.incremental:
+            self.candidate_counts[extend_pattern(prefix, extension)] = support_count
+        
+        # If support meets minimum threshold, add to the new class
+        if support_count >= min_support_count:
+            new_members.append((item, step, joined_id_list))
+            self.record_pattern(extend_pattern(prefix, extension), support_count, joined_id_list)
+    
+    def record_pattern(self, pattern, support_count, id_list):
+        """
+        Add a frequent pattern to the results (or to the top-k heap). For
+        closed/maximal output, entries carry a key of their sid set until
+        filter_closed.
+        """
+        if sum(map(len, pattern)) < self.min_length:
+            return
+        if self.output != 'all':
+            sids = id_list.sequence_ids()
+            key = (support_count, zlib.crc32(sids.astype(np.int32, copy=False).tobytes()))
+            self.frequent_sequences.append((self.decode_sequence(pattern), support_count / self.sequence_count, key))
+            return
+        if self.top_k is None:
+            self.frequent_sequences.append((self.decode_sequence(pattern), support_count / self.sequence_count))
+            return
+        
+        self.top_k_order += 1
+        heapq.heappush(self.top_patterns, (support_count, -self.top_k_order, pattern))
+        if len(self.top_patterns) > self.top_k:
+            heapq.heappop(self.top_patterns)
+        if len(self.top_patterns) == self.top_k:
+            self.top_k_count = self.top_patterns[0][0]
+    
+    def top_k_sequences(self):
+        """Heap content as frequent_sequences, most frequent first"""
+        ordered = sorted(self.top_patterns, key=lambda entry: (-entry[0], -entry[1]))
+        return [(self.decode_sequence(pattern), count / self.sequence_count) for count, _, pattern in ordered]
+    
+    def mine_class_depth_first(self, prefix, members, prefix_list=None):
+        """
+        Depth-first mining of one equivalence class. The id-lists of each
+        sub-class are released as soon as its subtree has been mined.
+        prefix_list is the id-list of prefix (used by closed/maximal output).
+        """
+        skipped = self.absorbed_members(members, prefix_list)
+        # Progress is tracked on the root class and the classes of single items
+        depth = sum(map(len, prefix))
+        if depth == 0:
+            self.classes_total = len(members)
+        elif depth == 1:
+            self.subclasses = [0, len(members)]
+        for index in range(len(members)):
+            if depth == 0:
+                self.subclasses = [0, 1]
+            # A member that fell below a raised (top-k) threshold has no frequent extensions
+            if index not in skipped and members[index][2].support_count() >= self.min_support_count():
+                self.mine_member_depth_first(prefix, members, index)
+            if depth == 0:
+                self.classes_done = index + 1
+            elif depth == 1:
+                self.subclasses[0] = index + 1
+    
+    def mine_member_depth_first(self, prefix, members, index):
+        """Mine the subtree rooted at members[index] of the class prefix"""
+        new_prefix = extend_pattern(prefix, members[index])
+        self.progress_level = sum(map(len, new_prefix)) + 1
+        new_members = self.extend_member(new_prefix, members[index], members)
+        if new_members:
+            self.mine_class_depth_first(new_prefix, new_members, members[index][2])
+    
+    def absorbed_members(self, members, prefix_list):
+        """
+        Members of class P whose subtrees hold no closed pattern.
+        
+        If an itemset extension P+i(x) keeps every entry of P's id-list, x is
+        in the last itemset wherever P ends, and each later join gives the
+        same id-list with or without x. So any pattern P+e has a super-pattern
+        with x added to P's last itemset and the same support. Closed patterns
+        of the class therefore contain x (the smallest such item): they are
+        found below P+i(x) and below itemset members y < x, the others are
+        skipped (but still joined with as siblings).
+        """
+        if self.output == 'all' or prefix_list is None:
+            return set()
+        absorbed = [item for item, step, id_list in members
+                    if step == I_STEP and prefix_list.has_entries_of(id_list)]
+        if not absorbed:
+            return set()
+        x = min(absorbed)
+        return {index for index, (item, step, _) in enumerate(members)
+                if step == S_STEP or item > x}
+    
+    def cancel(self):
+        """Ask a running find_frequent_sequences or update to stop (thread-safe)"""
+        self._cancel.set()
+    
+    def report_progress(self, stage='mining', force=False, patterns=None):
+        """
+        Raise MiningCancelled if cancel() was called, else call the progress
+        callback. patterns: number found so far, if not in frequent_sequences.
+        """
+        if self._cancel.is_set():
+            raise MiningCancelled("Mining cancelled")
+        if self.progress is None:
+            return
+        now = time.perf_counter()
+        if force or now - self._progress_time >= self.PROGRESS_INTERVAL:
+            self._progress_time = now
+            if patterns is None:
+                patterns = len(self.top_patterns) if self.top_k is not None else len(self.frequent_sequences)
+            done = self.classes_done
+            if self.classes_done < self.classes_total and self.search == 'dfs' and self.n_jobs <= 1:
+                done += self.subclasses[0] / max(self.subclasses[1], 1)
+            fraction = done / self.classes_total if self.classes_total else 0.0
+            self.progress(MiningProgress(stage, self.progress_level, self.classes_done, self.classes_total,
+                                         self.stats['candidates'], patterns, fraction))
+    
+    def start_run(self):
+        """Reset the cancel flag and progress counters of a new run"""
+        self._cancel.clear()
+        self.progress_level = 1
+        self.classes_done = 0
+        self.classes_total = 0
+        self.subclasses = [0, 1]
+    
+    def min_support_count(self):
+        """Minimum number of sequences a frequent pattern must appear in"""
+        return max(self.min_support * self.sequence_count, self.top_k_count)
+    
+    def mining_options(self):
+        """Constructor arguments that reproduce this miner in a worker process"""
+        return {'min_support': self.min_support, 'search': 'dfs',
+                'engine': self.selected_engine or self.engine,
+                'early_pruning': self.early_pruning, 'incremental': self.incremental,
+                'top_k': self.top_k, 'min_length': self.min_length, 'output': self.output,
+                'max_length': self.max_length, 'min_gap': self.min_gap, 'max_gap': self.max_gap,
+                'max_window': self.max_window}
+    
+    def result_key(self):
+        """ResultStore key: the database content and the options that change the results"""
+        key = self.database.fingerprint()
+        options = (self.output, self.min_length, self.max_length, self.min_gap, self.max_gap, self.max_window)
+        if options != ('all', 1, None, None, None, None):
+            key += '-' + hashlib.sha1(repr(options).encode()).hexdigest()[:12]
+        return key
+    
+    def decode_sequence(self, sequence):
+        """Map a pattern of item ids back to a list of itemsets of StockCodes"""
+        return [self.database.items[list(itemset)].tolist() for itemset in sequence]
+    
+    def label_pattern(self, sequence):
+        """Hashable StockCode form of a pattern, stable when item ids change"""
+        return tuple(tuple(itemset) for itemset in self.decode_sequence(sequence))
+    
+    def id_pattern(self, pattern):
+        """Inverse of label_pattern"""
+        return tuple(tuple(self.item_ids[item] for item in itemset) for itemset in pattern)
+    
+    def pattern_id_list(self, pattern):
+        """Id-list of a pattern of frequent item ids, joined from the vertical database"""
+        prefix, (item, step) = split_pattern(pattern)
+        if not prefix:
+            return self.vertical_db[item]
+        if step == S_STEP:
+            return self.id_list_join(self.pattern_id_list(prefix), self.vertical_db[item])
+        return self.itemset_join(self.pattern_id_list(prefix), self.vertical_db[item])
+    
+    def root_members(self):
+        """Members of the root class: all frequent items share the empty prefix"""
+        return [(item_id, S_STEP, self.vertical_db[item_id]) for item_id in sorted(self.vertical_db)]
     
     def find_frequent_sequences(self):
         """Main method to find all frequent sequences"""
+        # A maximal set only holds the patterns maximal at its own threshold:
+        # those of a higher one are not in it, so it cannot be reused
+        use_store = self.result_store is not None and self.top_k is None and self.output != 'maximal'
+        if use_store:
+            key = self.result_key()
+            stored = self.result_store.lookup(key, self.min_support)
+            if stored is not None:
+                # No candidate counts to update from: update() will mine again
+                self.frequent_sequences = stored
+                self.tracked_counts = None
+                return self.frequent_sequences
+        
         # Find frequent 1-sequences
-        frequent_items = self.find_frequent_items()
-        
-        k = 2
-        # Continue until no more frequent sequences can be found
-        while True:
-            candidates = self.generate_candidate_sequences(frequent_items, k)
-            if not candidates:
-                break
-            k += 1
+        self.start_run()
+        self.top_patterns = []
+        self.top_k_count = 0
+        self.top_k_order = 0
+        self.find_frequent_items()
+        self.candidate_counts = {}
+        self.progress_level = 2
+        self.report_progress('items', force=True)
+        
+        # The root class: all frequent items share the empty prefix
+        classes = {(): self.root_members()}
+        if self.top_k is not None:
+            # Frequent items first, so that the threshold rises early
+            classes[()].sort(key=lambda member: -member[2].support_count())
+        
+        if self.n_jobs > 1 and len(classes[()]) > 1:
+            from parallel_mining import mine_in_parallel
+            self.frequent_sequences.extend(mine_in_parallel(self, classes[()], self.n_jobs))
+        elif self.search == 'dfs':
+            self.mine_class_depth_first((), classes[()])
+        else:
+            # Continue until no more frequent sequences can be found
+            while classes:
+                classes = self.generate_candidate_sequences(classes)
+        
+        if self.incremental:
+            self.tracked_counts = {self.label_pattern(pattern): count
+                                   for pattern, count in self.candidate_counts.items()}
+            self.candidate_counts = {}
+        
+        if self.top_k is not None:
+            # Parallel runs return the top k of every root class
+            self.frequent_sequences = self.top_k_sequences() + self.frequent_sequences
         
         # Sort frequent sequences by support (descending)
         self.frequent_sequences.sort(key=lambda x: x[1], reverse=True)
+        if self.top_k is not None:
+            del self.frequent_sequences[self.top_k:]
+        if self.output != 'all':
+            self.frequent_sequences = filter_closed(self.frequent_sequences, self.output == 'maximal')
+        if use_store:
+            self.result_store.save(key, self.min_support, self.sequence_count, self.frequent_sequences)
+        self.classes_done = self.classes_total
+        self.report_progress('done', force=True)
+        return self.frequent_sequences
+    
+    def update(self, new_rows):
+        """
+        Add new transaction rows and update frequent_sequences.
+        
+        Only the customers that appear in new_rows are recounted (unless
+        there are more than INCREMENTAL_MAX_CHANGED of them): for the tracked
+        patterns (frequent or in the negative border) that can change, the
+        support on their old sequences is replaced by the support on their
+        new ones. Added rows keep every old itemset, so only patterns holding
+        an item of new_rows can gain support. A pattern can only become
+        frequent if it, or a pattern it is generated from, was in the
+        negative border, so only the equivalence classes of promoted patterns
+        are mined again. A change in the set of frequent items changes every
+        class, so it falls back to a full run.
+        
+        The recount and re-mining scale with the changed customers and the
+        affected classes; the database itself is still rebuilt (vectorized)
+        and the frequent patterns are read back from all tracked counts.
+        """
+        if not self.incremental or self.transactions is None:
+            raise ValueError("update() needs incremental=True and a previous preprocess_data()")
+        new_rows = new_rows.loc[new_rows['CustomerID'].notna(), SEQUENCE_COLUMNS]
+        if new_rows.empty:
+            return self.frequent_sequences
+        self.start_run()
+        
+        counts = None
+        changed_customers = new_rows['CustomerID'].unique()
+        if (self.tracked_counts is not None and
+                len(changed_customers) <= self.INCREMENTAL_MAX_CHANGED * self.sequence_count):
+            # Old and new sequences of the changed customers in one database:
+            # weights -1 (old) and +1 (new) sum to the change of every support
+            old_rows = self.transactions[self.transactions['CustomerID'].isin(changed_customers)]
+            changed_rows = pd.concat([old_rows, old_rows, new_rows], ignore_index=True)
+            # Customer c becomes 2c (old sequence) and 2c + 1 (new sequence)
+            is_new = np.arange(len(changed_rows)) >= len(old_rows)
+            changed_rows['CustomerID'] = 2 * pd.factorize(changed_rows['CustomerID'])[0] + is_new
+            changed = build_sequence_arrays(changed_rows)
+            weights = np.where(changed.customers % 2 == 1, 1, -1)
+            # A pattern found in a new sequence but not in the old one uses a
+            # new row, unless an old invoice spanning several dates is split by
+            # a row dated in between: then every pattern whose items all occur
+            # in the changed sequences is recounted
+            new_items = set(new_rows['StockCode'].tolist())
+            present = set(changed.items.tolist())
+            if not (old_rows.empty or
+                    old_rows.groupby(['CustomerID', 'InvoiceNo'])['InvoiceDate'].nunique().max() <= 1):
+                new_items = present
+            affected = []
+            for pattern in self.tracked_counts:
+                pattern_items = [item for itemset in pattern for item in itemset]
+                if not new_items.isdisjoint(pattern_items) and present.issuperset(pattern_items):
+                    affected.append(pattern)
+            delta = count_patterns(changed, affected, weights)
+            delta = {pattern: change for pattern, change in delta.items() if change}
+            counts = dict(self.tracked_counts)
+            for pattern, change in delta.items():
+                counts[pattern] += change
+        
+        old_min_count = self.min_support_count()
+        old_items = {sequence[0][0] for sequence, _ in self.frequent_sequences
+                     if len(sequence) == 1 and len(sequence[0]) == 1}
+        
+        self.transactions = pd.concat([self.transactions, new_rows], ignore_index=True)
+        self.load_database(build_sequence_arrays(self.transactions))
+        self.frequent_sequences = []
+        min_count = self.min_support_count()
+        items = {self.database.items[item_id] for item_id, id_list in self.vertical_db.items()
+                 if id_list.support_count() >= min_count}
+        if counts is None or items != old_items:
+            return self.find_frequent_sequences()
+        self.find_frequent_items()
+        single_items = self.frequent_sequences
+        
+        # A promoted pattern creates new candidates with all members of the
+        # class it belongs to: mine those classes again, outermost ones only.
+        # The threshold only rises, so promoted patterns are among the changed ones.
+        promoted = {split_pattern(pattern)[0] for pattern in delta
+                    if counts[pattern] >= min_count and self.tracked_counts[pattern] < old_min_count}
+        classes = {prefix for prefix in promoted if promoted.isdisjoint(prefix_chain(prefix))}
+        
+        # Every tracked count is exact, so the patterns below the classes are
+        # kept: mining the classes again overwrites the counts it evaluates
+        self.tracked_counts = counts
+        members = defaultdict(list)
+        for pattern, count in (self.tracked_counts.items() if classes else ()):
+            prefix, (item, step) = split_pattern(pattern)
+            if prefix in classes and count >= min_count:
+                members[prefix].append((self.item_ids[item], step, pattern))
+        
+        self.frequent_sequences = []
+        self.candidate_counts = {}
+        self.classes_total = len(classes)
+        for prefix in classes:
+            self.classes_done += 1
+            prefix_ids = self.id_pattern(prefix)
+            prefix_list = self.pattern_id_list(prefix_ids)
+            class_members = []
+            for item_id, step, pattern in sorted(members[prefix]):
+                if step == S_STEP:
+                    id_list = self.id_list_join(prefix_list, self.vertical_db[item_id])
+                else:
+                    id_list = self.itemset_join(prefix_list, self.vertical_db[item_id])
+                class_members.append((item_id, step, id_list))
+            self.mine_class_depth_first(prefix_ids, class_members)
+        for pattern, count in self.candidate_counts.items():
+            self.tracked_counts[self.label_pattern(pattern)] = count
+        self.candidate_counts = {}
+        
+        self.frequent_sequences = single_items + [
+            ([list(itemset) for itemset in pattern], count / self.sequence_count)
+            for pattern, count in self.tracked_counts.items()
+            if count >= min_count and sum(map(len, pattern)) >= self.min_length]
+        self.frequent_sequences.sort(key=lambda x: x[1], reverse=True)
+        self.report_progress('done', force=True)
         return self.frequent_sequences
 
 # Legacy functions to maintain compatibility with existing code
@@ -0,0 +1,200 @@
+"""
+Cleaned transactions saved in a columnar binary format.
+
+A transaction set is a directory with meta.json and either
+transactions.feather (Arrow, when pyarrow is installed) or one .npy file per
+column. Text columns are stored as categories (integer codes plus their
+labels) and dates as datetime64, so loading a set skips the CSV parsing and
+pd.to_datetime of clean_data. The .npy columns and the uncompressed Feather
+file are memory-mapped and only the requested columns are read.
+
+TransactionStore keeps the cleaned set of every CSV loaded in the GUI, one
+per CSV path, used while the size and modification time of the CSV match.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from atomic_write import atomic_write
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'transactions')
+# Bump when clean_data or the file layout changes
+STORE_VERSION = 1
+
+META_FILE = 'meta.json'
+FEATHER_FILE = 'transactions.feather'
+FORMATS = ('feather', 'npy')
+
+
+def _feather():
+    """pyarrow.feather, or None when pyarrow is not installed"""
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+    return feather
+
+
+def default_format():
+    return 'feather' if _feather() is not None else 'npy'
+
+
+def is_transaction_set(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def _encoded(series):
+    """series as stored: numbers and dates as they are, anything else as categories of str"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype) or (isinstance(dtype, np.dtype) and dtype.kind in 'biufM'):
+        return series
+    # Labels must be one plain type to be saved without pickling
+    if (isinstance(dtype, pd.CategoricalDtype) and
+            pd.api.types.infer_dtype(dtype.categories) in ('string', 'integer', 'floating', 'empty')):
+        return series
+    if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+        series = series.astype(str).where(series.notna())
+    return series.astype('category')
+
+
+def _column_meta(name, series):
+    meta = {'name': name}
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        meta['kind'] = 'category'
+    elif isinstance(series.dtype, pd.DatetimeTZDtype):
+        meta['kind'] = 'datetime'
+        meta['tz'] = str(series.dt.tz)
+    else:
+        meta['kind'] = 'values'
+    return meta
+
+
+def _save_columns(directory, frame, columns):
+    """One .npy per column; categories as their codes and their labels"""
+    for k, column in enumerate(columns):
+        series = frame[column['name']]
+        if column['kind'] == 'category':
+            values = series.cat.codes.to_numpy()
+            labels = series.cat.categories.to_numpy(dtype=object).tolist()
+            np.save(os.path.join(directory, f"{k}.categories.npy"), np.asarray(labels))
+        elif column['kind'] == 'datetime':
+            values = series.dt.tz_convert(None).to_numpy()
+        else:
+            values = series.to_numpy()
+        np.save(os.path.join(directory, f"{k}.npy"), values)
+
+
+def save_transactions(df, path, fmt=None, source=None):
+    """
+    Write df as a transaction set in the directory path, replacing it.
+    fmt: 'feather' or 'npy', feather by default when pyarrow is installed.
+    source: JSON data kept in meta.json, describing where df comes from.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown transaction set format {fmt}; use {' or '.join(FORMATS)}")
+    feather = _feather()
+    if fmt == 'feather' and feather is None:
+        raise ImportError("Feather transaction sets need pyarrow")
+
+    frame = pd.DataFrame({column: _encoded(df[column]) for column in df.columns}, copy=False)
+    meta = {'version': STORE_VERSION, 'format': fmt, 'rows': len(frame),
+            'columns': [_column_meta(column, frame[column]) for column in frame.columns], 'source': source}
+
+    with atomic_write(path, directory=True) as staging:
+        if fmt == 'feather':
+            # Uncompressed, so that reads can map the file instead of decoding it
+            feather.write_feather(frame, os.path.join(staging, FEATHER_FILE), compression='uncompressed')
+        else:
+            _save_columns(staging, frame, meta['columns'])
+        with open(os.path.join(staging, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+
+def read_meta(path):
+    with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != STORE_VERSION or meta.get('format') not in FORMATS:
+        raise ValueError(f"{path} is not a transaction set of version {STORE_VERSION}")
+    return meta
+
+
+def load_transactions(path, columns=None, memory_map=True):
+    """
+    Frame of a transaction set. columns: names to read (all by default);
+    memory_map: map the files instead of reading them into memory.
+    """
+    meta = read_meta(path)
+    stored = {column['name']: (k, column) for k, column in enumerate(meta['columns'])}
+    names = list(stored) if columns is None else list(columns)
+    missing = [name for name in names if name not in stored]
+    if missing:
+        raise ValueError(f"No column {', '.join(missing)} in {path}")
+
+    if meta['format'] == 'feather':
+        feather = _feather()
+        if feather is None:
+            raise ImportError(f"{path} is a Feather transaction set, reading it needs pyarrow")
+        table = feather.read_table(os.path.join(path, FEATHER_FILE), columns=names, memory_map=memory_map)
+        return table.to_pandas()
+
+    mmap_mode = 'r' if memory_map else None
+    frame = {}
+    for name in names:
+        k, column = stored[name]
+        # Plain ndarray view of the memmap, so pandas results are not memmaps
+        values = np.asarray(np.load(os.path.join(path, f"{k}.npy"), mmap_mode=mmap_mode))
+        if column['kind'] == 'category':
+            labels = np.load(os.path.join(path, f"{k}.categories.npy"))
+            labels = labels.astype(object) if labels.dtype.kind == 'U' else labels
+            values = pd.Categorical.from_codes(values, categories=labels)
+        elif column['kind'] == 'datetime':
+            values = pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(column['tz'])
+        frame[name] = values
+    return pd.DataFrame(frame, copy=False)
+
+
+class TransactionStore:
+    def __init__(self, directory=STORE_DIR, fmt=None):
+        """
+        directory: where the sets are saved, one per CSV (None to disable).
+        fmt: format of the saved sets (see save_transactions).
+        """
+        self.directory = directory
+        self.fmt = fmt
+
+    def path(self, file_path):
+        """Directory of the set of file_path"""
+        return os.path.join(self.directory, hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest())
+
+    @staticmethod
+    def source(file_path):
+        """What a saved set must match to stand for the current content of file_path"""
+        stat = os.stat(file_path)
+        return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def load(self, file_path, columns=None):
+        """Saved cleaned transactions of file_path, or None"""
+        if self.directory is None or not os.path.isfile(file_path):
+            return None
+        path = self.path(file_path)
+        try:
+            if read_meta(path).get('source') != self.source(file_path):
+                return None
+            return load_transactions(path, columns)
+        except (OSError, ValueError, ImportError):
+            # No set yet, an older or partial one: the CSV is read again
+            return None
+
+    def save(self, file_path, df):
+        """Save the cleaned transactions of file_path (replacing its older set)"""
+        if self.directory is None:
+            return
+        try:
+            save_transactions(df, self.path(file_path), self.fmt, self.source(file_path))
+        except (OSError, ValueError, ImportError):
+            # The store is optional: read-only location, no pyarrow for a requested feather set
+            pass
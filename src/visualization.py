@@ -7,8 +7,13 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolb
 import seaborn as sns
 import numpy as np
 
-def create_visualizations(df, container):
+from product_catalog import ProductCatalog
+
+def create_visualizations(df, container, catalog=None):
     """Create and display visualizations in the provided container"""
+    if catalog is None:
+        catalog = ProductCatalog.from_transactions(df, products_path=None)
+    
     # Clear the container
     for widget in container.winfo_children():
         widget.destroy()
@@ -44,19 +49,9 @@ def create_visualizations(df, container):
     # Get top products and show product descriptions if available
     top_products = df.groupby('StockCode')['Quantity'].sum().nlargest(10)
     
-    # Try to get descriptions for better labels
-    if 'Description' in df.columns:
-        labels = []
-        for code in top_products.index:
-            desc_rows = df[df['StockCode'] == code]['Description'].unique()
-            if len(desc_rows) > 0:
-                # Truncate long descriptions
-                desc = str(desc_rows[0])
-                if len(desc) > 20:
-                    desc = desc[:18] + '...'
-                labels.append(f"{code}\n{desc}")
-            else:
-                labels.append(code)
+    # Try to get descriptions for better labels (truncated to 20 characters)
+    if len(catalog):
+        labels = [catalog.label(code, 20, "\n") for code in top_products.index]
     else:
         labels = top_products.index
     
@@ -92,18 +87,8 @@ def create_visualizations(df, container):
                 color=sns.color_palette("Greens_d", len(top_revenue)))
         
         # Try to get descriptions for better labels
-        if 'Description' in df.columns:
-            rev_labels = []
-            for code in top_revenue.index:
-                desc_rows = df[df['StockCode'] == code]['Description'].unique()
-                if len(desc_rows) > 0:
-                    # Truncate long descriptions
-                    desc = str(desc_rows[0])
-                    if len(desc) > 20:
-                        desc = desc[:18] + '...'
-                    rev_labels.append(f"{code}: {desc}")
-                else:
-                    rev_labels.append(code)
+        if len(catalog):
+            rev_labels = [catalog.label(code, 20) for code in top_revenue.index]
         else:
             rev_labels = top_revenue.index
             
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The application modules use flat imports (as when main.py runs from src/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
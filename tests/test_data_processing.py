@@ -0,0 +1,20 @@
+from data_processing import load_and_process_data, load_sequence_database
+
+CSV = """InvoiceNo,StockCode,Description,Quantity,InvoiceDate,UnitPrice,CustomerID,Country
+536365,A001,Coffee Mug,2,2023-01-01 10:15,3.5,1001.0,Vietnam
+536366,A002,Tea Cup,1,2023-01-02 11:00,2.5,oops,Vietnam
+536367,A003,Notebook,3,2023-01-03 09:30,1.2,1002,Vietnam
+"""
+
+
+def test_malformed_customer_id_drops_only_its_row(tmp_path):
+    path = tmp_path / "transactions.csv"
+    path.write_text(CSV)
+
+    df = load_and_process_data(str(path))
+    assert df['InvoiceNo'].tolist() == ['536365', '536367']
+    assert df['CustomerID'].tolist() == [1001, 1002]
+
+    database, rows = load_sequence_database(str(path))
+    assert rows == 2
+    assert database.sequence_count == 2
@@ -0,0 +1,19 @@
+from recommendation import generate_recommendations
+from spade_algorithm import find_frequent_itemsets
+
+
+def test_singleton_itemsets_are_recommended_by_count():
+    transactions = [['A', 'B'], ['A'], ['A', 'C'], ['B']]
+    frequent_itemsets = find_frequent_itemsets(transactions, 0.25)
+
+    assert generate_recommendations(frequent_itemsets) == [(['A'], 3), (['B'], 2), (['C'], 1)]
+
+
+def test_itemsets_without_a_confident_rule_are_dropped():
+    frequent_itemsets = {frozenset(['A']): 10, frozenset(['B']): 8, frozenset(['C']): 2,
+                         frozenset(['A', 'B']): 6, frozenset(['A', 'C']): 1}
+
+    # A -> B has confidence 0.6; the best rule of {A, C} is C -> A at 0.5
+    recommendations = generate_recommendations(frequent_itemsets, min_confidence=0.55)
+    assert [(set(items), count) for items, count in recommendations] == [
+        ({'A'}, 10), ({'B'}, 8), ({'A', 'B'}, 6), ({'C'}, 2)]
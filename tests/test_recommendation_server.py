@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from recommendation import NextItemIndex
+from recommendation_server import RecommendationServer
+
+SEQUENCES = [([['A']], 0.5), ([['B']], 0.4), ([['A'], ['B']], 0.3)]
+
+
+@pytest.fixture
+def server():
+    server = RecommendationServer('patterns.jsonl')
+    server.swap(NextItemIndex(SEQUENCES), pattern_count=len(SEQUENCES))
+    return server
+
+
+def test_batch_answers_items_and_baskets(server):
+    items = json.loads(server.recommend_batch(b'{"items": ["A"]}'))
+    assert [entry['item'] for entry in items['results'][0]['recommendations']] == ['B']
+    baskets = json.loads(server.recommend_batch(b'{"baskets": [["A"]]}'))
+    assert [entry['item'] for entry in baskets['results'][0]['recommendations']] == ['B']
+
+
+@pytest.mark.parametrize('body', [b'{"items": 5}', b'{"items": "abc"}', b'{"baskets": ["abc"]}',
+                                  b'{"baskets": {"A": 1}}', b'{"items": ["A"], "k": [1]}',
+                                  b'{"items": ["A"], "min_confidence": NaN}',
+                                  b'{"items": ["A"], "min_confidence": "inf"}'])
+def test_batch_rejects_malformed_bodies(server, body):
+    # ValueError is answered with 400 by RecommendationServer.handle
+    with pytest.raises(ValueError):
+        server.recommend_batch(body)
+
+
+def test_get_rejects_non_finite_min_confidence(server):
+    with pytest.raises(ValueError):
+        server.recommend({'item': ['A'], 'min_confidence': ['nan']})
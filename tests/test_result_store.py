@@ -0,0 +1,19 @@
+import os
+
+from result_store import ResultStore
+
+SEQUENCES = [([['A']], 0.5), ([['A'], ['B']], 0.25)]
+
+
+def test_least_recently_used_results_are_removed(tmp_path):
+    keys = [f"{i:040x}" for i in range(3)]
+    for age, key in enumerate(keys):
+        ResultStore(str(tmp_path)).save(key, 0.25, 4, SEQUENCES)
+        os.utime(tmp_path / f"{key}.json", (age, age))
+    (tmp_path / "notes.json").write_text("{}")
+
+    # Reading keys[0] makes it the most recently used: keys[1] goes next
+    assert ResultStore(str(tmp_path)).lookup(keys[0], 0.5) == [([['A']], 0.5)]
+    ResultStore(str(tmp_path), max_disk_entries=2).save(f"{3:040x}", 0.25, 4, SEQUENCES)
+
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{keys[0]}.json", f"{3:040x}.json", "notes.json"])
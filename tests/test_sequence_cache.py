@@ -0,0 +1,28 @@
+import os
+
+import pandas as pd
+
+from sequence_cache import SequenceCache
+
+
+def frame(customer):
+    return pd.DataFrame({'CustomerID': [customer, customer], 'InvoiceNo': ['1', '2'],
+                         'InvoiceDate': pd.to_datetime(['2023-01-01', '2023-01-02']),
+                         'StockCode': ['A', 'B']})
+
+
+def test_disk_entries_are_capped_without_touching_other_files(tmp_path):
+    (tmp_path / 'results').mkdir()
+    cache = SequenceCache(str(tmp_path), max_disk_entries=2)
+    for age, customer in enumerate([1, 2, 3]):
+        cache.load(frame(customer))
+        for name in os.listdir(tmp_path):
+            if name != 'results' and os.path.getmtime(tmp_path / name) > 1000:
+                os.utime(tmp_path / name, (age, age))
+
+    entries = [name for name in os.listdir(tmp_path) if name != 'results']
+    assert len(entries) == 2
+    assert os.path.isdir(tmp_path / 'results')
+    # The newest entry is read back from disk
+    database = SequenceCache(str(tmp_path)).load(frame(3))
+    assert database.customers.tolist() == [3]